@@ -0,0 +1,129 @@
+# locust goes first, it monkey patches the process before anything else opens a socket or starts a thread
+import locust
+
+import argparse
+import importlib
+import json
+import os
+import tempfile
+import time
+
+import gevent
+import psutil
+from locust.argument_parser import parse_options
+from locust.env import Environment
+
+from benchmarks.cases import SPAWN_TIMEOUT, WARMUP, get_case
+from benchmarks.stand_ins import StandInUnavailable
+from src.constants import PARAMS_JSON_FILENAME
+from src.olaf.payload_corpus import compile_payload_corpus
+
+
+def measure_step(environment, runner, process, users, request_type, duration):
+    runner.start(users, spawn_rate=users * 10)
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while runner.user_count < users and time.monotonic() < deadline:
+        gevent.sleep(0.1)
+    gevent.sleep(WARMUP)
+
+    environment.stats.reset_all()
+    cpu_start = process.cpu_times()
+    start = time.perf_counter()
+    gevent.sleep(duration)
+    elapsed = time.perf_counter() - start
+    cpu_end = process.cpu_times()
+
+    entries = [entry for entry in environment.stats.entries.values() if entry.method == request_type]
+    requests = sum(entry.num_requests for entry in entries)
+    failures = sum(entry.num_failures for entry in entries)
+    cpu_seconds = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    return {
+        "users": runner.user_count,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "failure_ratio": failures / requests if requests else 1.0,
+        "avg_response_ms": sum(entry.total_response_time for entry in entries) / requests if requests else None,
+        # cpu of the whole worker process, a saturated worker sits close to 1.0
+        "cpu_utilization": cpu_seconds / elapsed,
+        "cpu_us_per_request": cpu_seconds / requests * 1e6 if requests else None,
+        "rss_bytes": process.memory_info().rss,
+    }
+
+
+def measure_case(case, options) -> dict:
+    module = importlib.import_module(case.module)
+    user_class = getattr(module, case.user_class)
+    process = psutil.Process()
+    with tempfile.TemporaryDirectory() as session_dir, case.stand_in() as target:
+        params = case.build_params(target)
+        params.cur_session_dir = session_dir
+        with open(os.path.join(session_dir, PARAMS_JSON_FILENAME), "w") as f:
+            f.write(params.json())
+        if case.corpus_encoder:
+            compile_payload_corpus(params.query_json, session_dir, encoder=case.corpus_encoder)
+
+        host = str(getattr(params, "url", case.name))
+        parsed_options = parse_options(["-f", module.__file__, "--host", host, "--session_dir", session_dir])
+        environment = Environment(user_classes=[user_class], host=host, events=locust.events,
+                                  parsed_options=parsed_options)
+        runner = environment.create_local_runner()
+        locust.events.init.fire(environment=environment, runner=runner, web_ui=None)
+
+        baseline_rss = process.memory_info().rss
+        steps = []
+        best = None
+        users = 1
+        while users <= options.max_users:
+            step = measure_step(environment, runner, process, users, case.request_type, options.step_duration)
+            steps.append(step)
+            sustainable = step["failure_ratio"] <= options.max_failure_ratio
+            improved = best is None or step["rps"] >= best["rps"] * (1 + options.min_gain)
+            if sustainable and (best is None or step["rps"] > best["rps"]):
+                best = step
+            if not sustainable or not improved:
+                break
+            users *= 2
+        runner.quit()
+
+    if len(steps) > 1:
+        # the slope leaves out what every worker pays once, shared clients and the stand-in included
+        memory_per_user = (steps[-1]["rss_bytes"] - steps[0]["rss_bytes"]) / (steps[-1]["users"] - steps[0]["users"])
+    else:
+        memory_per_user = (steps[0]["rss_bytes"] - baseline_rss) / steps[0]["users"]
+    result = {"memory_per_user_bytes": memory_per_user, "steps": steps}
+    if best is None:
+        result["error"] = "no ramp step stayed under the failure ratio"
+        return result
+    result.update({
+        "max_sustainable_rps": best["rps"],
+        "users_at_max": best["users"],
+        "cpu_us_per_request": best["cpu_us_per_request"],
+        "cpu_utilization": best["cpu_utilization"],
+        "avg_response_ms": best["avg_response_ms"],
+    })
+    return result
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="benchmarks one user class, started by run_benchmarks")
+    parser.add_argument("case", type=str)
+    parser.add_argument("output", type=str)
+    parser.add_argument("--max_users", type=int, default=256)
+    parser.add_argument("--step_duration", type=float, default=10)
+    parser.add_argument("--min_gain", type=float, default=0.05)
+    parser.add_argument("--max_failure_ratio", type=float, default=0.01)
+    return parser.parse_args(args)
+
+
+def main():
+    options = parse_args()
+    try:
+        result = measure_case(get_case(options.case), options)
+    except StandInUnavailable as err:
+        result = {"skipped": str(err)}
+    with open(options.output, "w") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+from benchmarks.stand_ins import (BENCH_REGION, BENCH_INDEX, BENCH_DB, BENCH_COLLECTION, BENCH_STREAM,
+                                  http_stand_in, sqs_stand_in, sns_stand_in, lambda_stand_in, mongo_stand_in,
+                                  redis_stand_in)
+from src.olaf.datamodel import (RestGetUserParams, RestPostUserParams, ElasticsearchUserParams, MongoDBUserParams,
+                                SQSUserParams, SNSUserParams, LambdaUserParams, RedisStreamUserParams)
+from src.olaf.payload_corpus import encode_json, encode_lambda_event
+
+# module and class of the user under test, the request type counted as its throughput, the stand-in it runs
+# against, and how params (and the payload corpus, when the driver compiles one) are built for that stand-in
+BenchmarkCase = namedtuple("BenchmarkCase", "name, module, user_class, request_type, stand_in, build_params, "
+                                            "corpus_encoder")
+
+# seconds users get to spawn, then to settle, before a ramp step is measured
+SPAWN_TIMEOUT = 60
+WARMUP = 1
+
+QUERY_JSON = [{"query": {"match_all": {}}, "size": 1}]
+MESSAGE_JSON = [{"id": n, "body": "olaf benchmark message"} for n in range(16)]
+AWS_CREDENTIALS = {"access_key": "testing", "secret_key": "testing", "aws_region": BENCH_REGION}
+
+BENCHMARK_CASES = [
+    BenchmarkCase("rest_get", "src.olaf.locust_users.rest_get_user", "RestGetUser", "GET", http_stand_in,
+                  lambda url: RestGetUserParams(url=url, header_json={}), None),
+    BenchmarkCase("rest_get_fasthttp", "src.olaf.locust_users.rest_get_fasthttp_user", "RestGetFastHttpUser", "GET",
+                  http_stand_in,
+                  lambda url: RestGetUserParams(url=url, header_json={}, engine="fasthttp"), None),
+    BenchmarkCase("rest_post", "src.olaf.locust_users.rest_post_user", "RestPostUser", "POST", http_stand_in,
+                  lambda url: RestPostUserParams(url=url, header_json={}, query_json=MESSAGE_JSON), encode_json),
+    BenchmarkCase("rest_post_fasthttp", "src.olaf.locust_users.rest_post_fasthttp_user", "RestPostFastHttpUser",
+                  "POST", http_stand_in,
+                  lambda url: RestPostUserParams(url=url, header_json={}, query_json=MESSAGE_JSON, engine="fasthttp"),
+                  encode_json),
+    BenchmarkCase("elasticsearch", "src.olaf.locust_users.elasticsearch_user", "ElasticsearchUser",
+                  "elasticsearch_query", http_stand_in,
+                  lambda url: ElasticsearchUserParams(url=url, access_key="bench", secret_key="bench",
+                                                      index_name=BENCH_INDEX, query_json=QUERY_JSON), None),
+    BenchmarkCase("mongo_db", "src.olaf.locust_users.mongo_user", "MongoReadUser", "mongo_find_one_query",
+                  mongo_stand_in,
+                  lambda mongo_url: MongoDBUserParams(mongo_url=mongo_url, db_name=BENCH_DB,
+                                                      collection_name=BENCH_COLLECTION, query_json=[{"id": 1}]),
+                  None),
+    BenchmarkCase("sqs", "src.olaf.locust_users.sqs_user", "SQSUser", "sqs_send_message", sqs_stand_in,
+                  lambda queue: SQSUserParams(sqs_name=queue, query_json=MESSAGE_JSON, message_attribute_json="{}",
+                                              custom_load_shape_params=None, **AWS_CREDENTIALS), encode_json),
+    BenchmarkCase("sns", "src.olaf.locust_users.sns_user", "SNSUser", "sns_publish_message", sns_stand_in,
+                  lambda topic_arn: SNSUserParams(sns_arn=topic_arn, query_json=MESSAGE_JSON,
+                                                  message_attribute_json="{}", custom_load_shape_params=None,
+                                                  **AWS_CREDENTIALS), encode_json),
+    BenchmarkCase("lambda", "src.olaf.locust_users.lambda_user", "LambdaUser", "invoke_lambda", lambda_stand_in,
+                  lambda function_arn: LambdaUserParams(lambda_arn=function_arn, query_json=MESSAGE_JSON,
+                                                        **AWS_CREDENTIALS), encode_lambda_event),
+    BenchmarkCase("redis_stream", "src.olaf.locust_users.redis_stream_producer_user", "RedisStreamProducerUser",
+                  "redis_stream_producer", redis_stand_in,
+                  lambda address: RedisStreamUserParams(redis_type="strict", host=address[0], port=address[1],
+                                                        stream_name=BENCH_STREAM, query_json=MESSAGE_JSON,
+                                                        maxlen=10_000), None),
+]
+
+# no local stand-in exists for these targets, they are listed in the results so the gap stays visible
+UNCOVERED_USERS = ["sagemaker", "kafka_producer", "pinecone_vector_search", "redis_vector_search"]
+
+
+def get_case(name) -> BenchmarkCase:
+    for case in BENCHMARK_CASES:
+        if case.name == name:
+            return case
+    raise KeyError(name)
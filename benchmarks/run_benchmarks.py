@@ -0,0 +1,114 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+from subprocess import run, TimeoutExpired
+
+from benchmarks.cases import BENCHMARK_CASES, UNCOVERED_USERS, SPAWN_TIMEOUT, WARMUP, get_case
+from src.constants import ROOT_PATH
+
+RESULTS_PATH = Path(__file__).absolute().parent / "results"
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="measure how much load a single olaf worker generates, "
+                                                 "each user class against a local stand-in of its target")
+    parser.add_argument("--cases", nargs="*", default=[case.name for case in BENCHMARK_CASES],
+                        choices=[case.name for case in BENCHMARK_CASES])
+    parser.add_argument("--max_users", type=int, default=256, help="users of the last ramp step")
+    parser.add_argument("--step_duration", type=float, default=10, help="seconds every ramp step is measured for")
+    parser.add_argument("--min_gain", type=float, default=0.05,
+                        help="the ramp stops once doubling the users raises throughput by less than this")
+    parser.add_argument("--max_failure_ratio", type=float, default=0.01,
+                        help="steps failing more requests than this are not sustainable")
+    parser.add_argument("--output", type=str, default=None, help="results file, one per version by default")
+    parser.add_argument("--baseline", type=str, default=None, help="earlier results file to compare against")
+    parser.add_argument("--regression_threshold", type=float, default=0.1,
+                        help="relative drop in rps (or rise in cpu per request) reported as a regression")
+    return parser.parse_args(args)
+
+
+def run_case_in_child(case, options) -> dict:
+    # every case gets a fresh interpreter, so neither memory nor gevent state carries over between user classes
+    ramp_steps = int(math.log2(options.max_users)) + 1
+    timeout = ramp_steps * (options.step_duration + WARMUP + SPAWN_TIMEOUT) + 60
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        args = [sys.executable, "-m", "benchmarks.bench_worker", case.name, output.name,
+                "--max_users", str(options.max_users),
+                "--step_duration", str(options.step_duration),
+                "--min_gain", str(options.min_gain),
+                "--max_failure_ratio", str(options.max_failure_ratio)]
+        try:
+            completed = run(args, cwd=ROOT_PATH.parent, timeout=timeout)
+        except TimeoutExpired:
+            return {"error": f"timed out after {timeout}s"}
+        try:
+            return json.load(output)
+        except ValueError:
+            return {"error": f"exited with {completed.returncode} without a result"}
+
+
+def package_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def compare_results(results, baseline, threshold) -> list:
+    regressions = []
+    for name, result in results["cases"].items():
+        previous = baseline["cases"].get(name, {})
+        if "max_sustainable_rps" not in result or "max_sustainable_rps" not in previous:
+            continue
+        rps_change = result["max_sustainable_rps"] / previous["max_sustainable_rps"] - 1
+        cpu_change = result["cpu_us_per_request"] / previous["cpu_us_per_request"] - 1
+        print(f"{name:<20} rps {rps_change:+.1%}  cpu/request {cpu_change:+.1%}")
+        if rps_change < -threshold or cpu_change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    options = parse_args()
+    with open(ROOT_PATH.parent / "version") as f:
+        olaf_version = f.read().strip()
+    results = {
+        "olaf_version": olaf_version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "locust": package_version("locust"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {key: getattr(options, key) for key in ["max_users", "step_duration", "min_gain",
+                                                            "max_failure_ratio"]},
+        "cases": {},
+        "uncovered": UNCOVERED_USERS,
+    }
+    for name in options.cases:
+        print(f"benchmarking {name}...")
+        results["cases"][name] = run_case_in_child(get_case(name), options)
+
+    output_path = Path(options.output) if options.output \
+        else RESULTS_PATH / f"{olaf_version}__{datetime.now():%Y%m%d_%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output_path}")
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = compare_results(results, json.load(f), options.regression_threshold)
+        if regressions:
+            print(f"regressions in {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import importlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from subprocess import DEVNULL, Popen
+from urllib.parse import urlparse
+
+BENCH_REGION = "us-east-1"
+BENCH_QUEUE = "olaf-bench"
+BENCH_TOPIC = "olaf-bench"
+BENCH_FUNCTION = "olaf-bench"
+BENCH_INDEX = "olaf-bench"
+BENCH_DB = "olaf_bench"
+BENCH_COLLECTION = "olaf_bench"
+BENCH_STREAM = "olaf-bench"
+
+ECHO_BODY = json.dumps({"status": "ok"}).encode("utf-8")
+SEARCH_BODY = json.dumps({"took": 1, "timed_out": False,
+                          "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                          "hits": {"total": {"value": 0, "relation": "eq"}, "max_score": None, "hits": []}}
+                         ).encode("utf-8")
+LAMBDA_HANDLER = "def handler(event, context):\n    return event\n"
+
+
+class StandInUnavailable(Exception):
+    pass
+
+
+def optional_import(module_name):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise StandInUnavailable(f"{module_name} is not installed")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise StandInUnavailable(f"stand-in did not come up on port {port}")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # keep-alive, like the targets olaf is pointed at
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        # the elasticsearch client refuses to talk to anything that does not claim to be elasticsearch
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        self._reply(SEARCH_BODY if self.path.split("?")[0].endswith("/_search") else ECHO_BODY)
+
+    def do_POST(self):
+        body = self._read_body()
+        self._reply(SEARCH_BODY if self.path.split("?")[0].endswith("/_search") else body or ECHO_BODY)
+
+    def do_HEAD(self):
+        self._reply(b"")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def http_stand_in():
+    # served from its own process, so it does not share the interpreter being measured
+    port = free_port()
+    server = Popen([sys.executable, "-m", "benchmarks.stand_ins", str(port)], cwd=os.getcwd())
+    try:
+        wait_for_port(port)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.terminate()
+        server.wait()
+
+
+@contextmanager
+def moto_stand_in():
+    optional_import("moto.server")
+    boto3 = optional_import("boto3")
+    # a moto server of its own, like the http stand-in, so its cpu is not counted as the benchmarked worker's
+    port = free_port()
+    server = Popen([sys.executable, "-m", "moto.server", "-p", str(port)], cwd=os.getcwd(),
+                   stdout=DEVNULL, stderr=DEVNULL)
+    endpoint_url = f"http://127.0.0.1:{port}"
+    # botocore reads the endpoint from the environment, the users create their clients as they would for aws
+    environ = {"AWS_ENDPOINT_URL": endpoint_url, "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+               "AWS_DEFAULT_REGION": BENCH_REGION}
+    previous_environ = {key: os.environ.get(key) for key in environ}
+    try:
+        wait_for_port(port)
+        # lambda invocations are answered by the server instead of in a docker container
+        config = urllib.request.Request(f"{endpoint_url}/moto-api/config", method="POST",
+                                        data=json.dumps({"lambda": {"use_docker": False}}).encode("utf-8"),
+                                        headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(config).close()
+        except urllib.error.HTTPError:
+            raise StandInUnavailable("moto 5.0.3 or later is needed for the aws stand-ins")
+        os.environ.update(environ)
+        yield boto3
+    finally:
+        for key, value in previous_environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        server.terminate()
+        server.wait()
+
+
+@contextmanager
+def sqs_stand_in():
+    with moto_stand_in() as boto3:
+        boto3.client("sqs", region_name=BENCH_REGION).create_queue(QueueName=BENCH_QUEUE)
+        yield BENCH_QUEUE
+
+
+@contextmanager
+def sns_stand_in():
+    with moto_stand_in() as boto3:
+        yield boto3.client("sns", region_name=BENCH_REGION).create_topic(Name=BENCH_TOPIC)["TopicArn"]
+
+
+@contextmanager
+def lambda_stand_in():
+    with moto_stand_in() as boto3:
+        role = boto3.client("iam", region_name=BENCH_REGION).create_role(
+            RoleName="olaf-bench", AssumeRolePolicyDocument=json.dumps({"Version": "2012-10-17", "Statement": []}))
+        code = io.BytesIO()
+        with zipfile.ZipFile(code, "w") as z:
+            z.writestr("lambda_function.py", LAMBDA_HANDLER)
+        function = boto3.client("lambda", region_name=BENCH_REGION).create_function(
+            FunctionName=BENCH_FUNCTION, Runtime="python3.8", Role=role["Role"]["Arn"],
+            Handler="lambda_function.handler", Code={"ZipFile": code.getvalue()})
+        yield function["FunctionArn"]
+
+
+@contextmanager
+def mongo_stand_in():
+    # an in-process mock would add its own cpu to the worker's, so only a real mongod is benchmarked against
+    pymongo = optional_import("pymongo")
+    mongo_url = os.environ.get("OLAF_BENCH_MONGO_URL", "mongodb://127.0.0.1:27017")
+    client = pymongo.MongoClient(mongo_url, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        raise StandInUnavailable(f"no mongod at {mongo_url}")
+    finally:
+        client.close()
+    yield mongo_url
+
+
+@contextmanager
+def redis_stand_in():
+    redis = optional_import("redis")
+    redis_url = os.environ.get("OLAF_BENCH_REDIS_URL", "redis://127.0.0.1:6379")
+    try:
+        redis.Redis.from_url(redis_url).ping()
+    except redis.exceptions.ConnectionError:
+        raise StandInUnavailable(f"no redis server at {redis_url}")
+    parsed = urlparse(redis_url)
+    yield parsed.hostname, parsed.port or 6379
+
+
+if __name__ == "__main__":
+    ThreadingHTTPServer(("127.0.0.1", int(sys.argv[1])), StandInHandler).serve_forever()
@@ -10,6 +10,7 @@ def create_path(p: Path):
 ROOT_PATH = Path(__file__).absolute().parent
 CONFIG_PATH = ROOT_PATH / 'config'
 SESSION_CREATION_PATH = ROOT_PATH.parent / "olaf_sessions"
+SESSION_REGISTRY_PATH = ROOT_PATH.parent / "olaf_session_registry.db"
 USER_TEMPLATE_PATH = ROOT_PATH / 'olaf' / 'locust_user_template'
 USER_CONCRETE_PATH = ROOT_PATH / 'olaf' / 'locust_users'
 
@@ -22,6 +23,13 @@ assert USER_CONCRETE_PATH.exists()
 create_path(SESSION_CREATION_PATH)
 
 PARAMS_JSON_FILENAME = "params.json"
+PAYLOAD_CORPUS_FILENAME = "payload_corpus.bin"
+PAYLOAD_INDEX_FILENAME = "payload_corpus.idx"
+# touched by the master once every report of the session is on disk
+REPORTS_WRITTEN_MARKER = "reports_written"
+RAW_TIMINGS_DIRNAME = "raw_timings"
+# written next to a worker's raw timing log once the log is closed
+RAW_TIMINGS_DONE_SUFFIX = ".done"
 
 CORE_SERVICES = ["REST GET",
                  "REST POST",
@@ -73,6 +81,19 @@ AWS_REGIONS = ["us-east-1", "us-east-2", "us-west-1", "us-west-2",
                "sa-east-1",
                ]
 
+REST_ENGINES = ["requests",
+                "fasthttp",
+                ]
+
+KAFKA_PRODUCER_MODES = ["sync",
+                        "async",
+                        ]
+
+ARRIVAL_MODES = ["closed",
+                 "fixed",
+                 "poisson",
+                 ]
+
 SAGEMAKER_PREDICTORS = [
     "pytorch predictor",
     "sklearn predictor",
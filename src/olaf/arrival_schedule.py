@@ -0,0 +1,99 @@
+import random
+import time
+from functools import wraps
+from typing import Optional
+
+import gevent
+from gevent.local import local
+from locust.env import Environment
+from locust.runners import MasterRunner
+
+from src.constants import ARRIVAL_MODES
+
+_task_local = local()
+
+
+def add_arrival_args(parser):
+    parser.add_argument("--arrival_mode", type=str, choices=ARRIVAL_MODES, default="closed",
+                        help="closed waits for a response before the next request, fixed and poisson issue requests "
+                             "on an arrival schedule")
+    parser.add_argument("--worker_rps", type=float, default=0, help="arrival rate of this worker")
+    parser.add_argument("--worker_rate_share", type=float, default=1.0,
+                        help="share of every per user class target rate run by this worker")
+
+
+class ArrivalSchedule:
+
+    def __init__(self, rate: float, mode: str):
+        self.rate = rate
+        self.mode = mode
+        self.next_slot = None
+
+    def next_gap(self) -> float:
+        if self.mode == "poisson":
+            return random.expovariate(self.rate)
+        return 1 / self.rate
+
+    def take_slot(self) -> float:
+        # all users of a worker draw from the same schedule, a slot in the past is started right away
+        now = time.perf_counter()
+        if self.next_slot is None:
+            self.next_slot = now
+        slot = self.next_slot
+        self.next_slot += self.next_gap()
+        return slot
+
+
+def open_loop_wait_time(schedule: ArrivalSchedule):
+    def wait_time(user):
+        slot = schedule.take_slot()
+        _task_local.intended_start = slot
+        return max(0.0, slot - time.perf_counter())
+
+    return wait_time
+
+
+def first_slot_on_start(on_start, wait_time):
+    @wraps(on_start)
+    def start(user):
+        on_start(user)
+        # locust runs the first task right after on_start, without this every spawned user skips the schedule once
+        # and a ramp-up bursts
+        gevent.sleep(wait_time(user))
+
+    return start
+
+
+def apply_wait_time(user_class, wait_time):
+    user_class.wait_time = wait_time
+    user_class.on_start = first_slot_on_start(user_class.on_start, wait_time)
+
+
+def get_intended_start() -> Optional[float]:
+    # perf_counter time the running task was scheduled for, None in closed loop
+    return getattr(_task_local, "intended_start", None)
+
+
+def apply_arrival_schedule(environment: Environment):
+    options = environment.parsed_options
+    if isinstance(environment.runner, MasterRunner):
+        return
+
+    # user classes with a target rate of their own (cocktail endpoints) hold it whatever the session's arrival mode
+    mode = options.arrival_mode if options.arrival_mode != "closed" else "fixed"
+    user_classes = []
+    for user_class in environment.user_classes:
+        target_rps = getattr(user_class, "target_rps", None)
+        if target_rps:
+            apply_wait_time(user_class,
+                            open_loop_wait_time(ArrivalSchedule(target_rps * options.worker_rate_share, mode)))
+        else:
+            user_classes.append(user_class)
+
+    if options.arrival_mode == "closed":
+        return
+    assert options.worker_rps > 0, f"{options.arrival_mode} arrival mode needs a positive worker rps"
+
+    schedule = ArrivalSchedule(options.worker_rps, options.arrival_mode)
+    for user_class in user_classes:
+        apply_wait_time(user_class, open_loop_wait_time(schedule))
@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Dict
+
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner
+
+BATCH_ENTRIES_KEY = "olaf_batch_entries"
+
+# entries sent and failed per "entry type name" since the last report (workers) or in total (master), kept out of
+# the request stats so a batch is one latency sample and one request however many entries it carries
+entry_counts = Counter()
+failed_entry_counts = Counter()
+
+
+class BatchEntryError(Exception):
+    pass
+
+
+def get_failed_entries(response: Dict, partial_failure_accounting: bool) -> Dict[str, Dict]:
+    failed = {entry["Id"]: entry for entry in response.get("Failed", [])}
+    if failed and not partial_failure_accounting:
+        raise BatchEntryError(f"{len(failed)} entries of the batch failed")
+    return failed
+
+
+def count_batch_entries(request_meta: Dict, entry_type: str, entries: int, failed: int = 0):
+    key = f"{entry_type} {request_meta['name']}"
+    entry_counts[key] += entries
+    # a batch that failed as a whole failed every entry in it
+    failed_entry_counts[key] += entries if request_meta["exception"] is not None else failed
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[BATCH_ENTRIES_KEY] = {"entries": dict(entry_counts), "failed": dict(failed_entry_counts)}
+    entry_counts.clear()
+    failed_entry_counts.clear()
+
+
+def on_worker_report(client_id, data, **kwargs):
+    report = data.get(BATCH_ENTRIES_KEY, {})
+    entry_counts.update(report.get("entries", {}))
+    failed_entry_counts.update(report.get("failed", {}))
+
+
+def enable_batch_entries(environment: Environment):
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        events.report_to_master.add_listener(on_report_to_master)
+
+
+def batch_entry_rows(environment: Environment):
+    total = environment.stats.total
+    elapsed = (total.last_request_timestamp or total.start_time) - total.start_time
+    for key in sorted(entry_counts):
+        entry_type, name = key.split(" ", 1)
+        entries, failed = entry_counts[key], failed_entry_counts[key]
+        yield [
+            entry_type,
+            name,
+            entries,
+            failed,
+            round(entries / elapsed, 2) if elapsed > 0 else 0,
+            round((entries - failed) / elapsed, 2) if elapsed > 0 else 0,
+        ]
+
+
+def batch_entries_csv(environment: Environment, writer):
+    writer.writerow(["Type", "Name", "Entries", "Failed Entries", "Entries/s", "Successful Entries/s"])
+    writer.writerows(batch_entry_rows(environment))
@@ -0,0 +1,100 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import psutil
+from gevent.lock import BoundedSemaphore, RLock
+
+POOL_STATS_KEY = "olaf_pool_stats"
+POOL_STATS_FIELDS = ["checkouts", "waits", "wait_ms", "in_use", "pool_size"]
+POOL_STATS_HEADER = ["Checkouts", "Waits", "Total Wait (ms)", "In Use", "Pool Size"]
+
+
+class SharedClient:
+
+    def __init__(self, name: str, client, pool_size: int):
+        self.name = name
+        self.client = client
+        self.pool_size = pool_size
+        self._slots = BoundedSemaphore(pool_size)
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+        self.in_use = 0
+
+    @contextmanager
+    def lease(self):
+        # every user of a worker borrows the same client, at most pool_size of them talk to the target at once.
+        # users time their request once leased, the wait for a free slot is generator side queueing and is
+        # reported here instead of in the request latency
+        if not self._slots.acquire(blocking=False):
+            self.waits += 1
+            wait_start = time.perf_counter()
+            self._slots.acquire()
+            self.wait_ms += (time.perf_counter() - wait_start) * 1000
+        self.checkouts += 1
+        self.in_use += 1
+        try:
+            yield self.client
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        return {field: getattr(self, field) for field in POOL_STATS_FIELDS}
+
+
+_registry: Dict[str, SharedClient] = {}
+_registry_lock = RLock()
+
+
+def get_shared_client(name: str, factory: Callable, pool_size: int) -> SharedClient:
+    shared_client = _registry.get(name)
+    if shared_client is None:
+        with _registry_lock:
+            shared_client = _registry.get(name)
+            if shared_client is None:
+                shared_client = SharedClient(name, factory(), pool_size)
+                _registry[name] = shared_client
+    return shared_client
+
+
+def count_open_sockets() -> int:
+    return len(psutil.Process().connections(kind="inet"))
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[POOL_STATS_KEY] = {
+        "clients": {name: shared_client.stats() for name, shared_client in _registry.items()},
+        "open_sockets": count_open_sockets(),
+    }
+
+
+class PoolStatsAggregator:
+
+    def __init__(self):
+        self.worker_reports: Dict[str, Dict] = {}
+
+    def on_worker_report(self, client_id, data, **kwargs):
+        if POOL_STATS_KEY in data:
+            self.worker_reports[client_id] = data[POOL_STATS_KEY]
+
+    def rows(self):
+        totals: Dict[str, Dict] = {}
+        for report in self.worker_reports.values():
+            for name, stats in report["clients"].items():
+                total = totals.setdefault(name, dict.fromkeys(POOL_STATS_FIELDS, 0))
+                for field in POOL_STATS_FIELDS:
+                    total[field] += stats[field]
+
+        open_sockets = sum(report["open_sockets"] for report in self.worker_reports.values())
+        return [[name, len(self.worker_reports)] + [total[field] for field in POOL_STATS_FIELDS]
+                + [round(total["wait_ms"] / total["checkouts"], 3) if total["checkouts"] else 0, open_sockets]
+                for name, total in totals.items()]
+
+    def to_csv(self, writer):
+        writer.writerow(["Name", "Workers"] + POOL_STATS_HEADER + ["Avg Wait per Checkout (ms)", "Open Sockets"])
+        writer.writerows(self.rows())
+
+
+pool_stats_aggregator = PoolStatsAggregator()
@@ -0,0 +1,28 @@
+from typing import Dict, List
+
+# user class run for every kind of endpoint, rest endpoints by engine as well
+ENDPOINT_USERS = {
+    "elasticsearch": ("src.olaf.locust_users.elasticsearch_user", "ElasticsearchUser"),
+    "mongo_db": ("src.olaf.locust_users.mongo_user", "MongoReadUser"),
+    "rest_get:requests": ("src.olaf.locust_users.rest_get_user", "RestGetUser"),
+    "rest_get:fasthttp": ("src.olaf.locust_users.rest_get_fasthttp_user", "RestGetFastHttpUser"),
+    "rest_post:requests": ("src.olaf.locust_users.rest_post_user", "RestPostUser"),
+    "rest_post:fasthttp": ("src.olaf.locust_users.rest_post_fasthttp_user", "RestPostFastHttpUser"),
+    "sagemaker": ("src.olaf.locust_users.sagemaker_user", "SagemakerUser"),
+    "sqs": ("src.olaf.locust_users.sqs_user", "SQSUser"),
+    "sns": ("src.olaf.locust_users.sns_user", "SNSUser"),
+    "lambda": ("src.olaf.locust_users.lambda_user", "LambdaUser"),
+}
+REST_KINDS = {"rest_get", "rest_post"}
+
+
+def endpoint_user(endpoint: Dict):
+    # module and class name of the user an endpoint of a cocktail runs
+    kind = endpoint["kind"]
+    return ENDPOINT_USERS[f"{kind}:{endpoint['engine']}" if kind in REST_KINDS else kind]
+
+
+def endpoint_user_modules(session_params: Dict) -> List[str]:
+    if session_params.get("kind") != "cocktail":
+        return []
+    return sorted({endpoint_user(endpoint)[0] for endpoint in session_params["user_resources"]})
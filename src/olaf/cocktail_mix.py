@@ -0,0 +1,91 @@
+from collections import Counter
+from functools import wraps
+
+from locust import events, TaskSet
+from locust.env import Environment
+from locust.runners import MasterRunner
+
+MIX_KEY = "olaf_cocktail_mix"
+
+# tasks run per cocktail user class since the last report (workers) or in total (master)
+task_counts = Counter()
+
+
+def endpoint_user_classes(environment: Environment):
+    return sorted((user_class for user_class in environment.user_classes
+                   if getattr(user_class, "endpoint_index", None) is not None),
+                  key=lambda user_class: user_class.endpoint_index)
+
+
+def counted_task(task_fn, class_name):
+    @wraps(task_fn)
+    def run(user):
+        task_counts[class_name] += 1
+        return task_fn(user)
+
+    return run
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[MIX_KEY] = dict(task_counts)
+    task_counts.clear()
+
+
+def on_worker_report(client_id, data, **kwargs):
+    task_counts.update(data.get(MIX_KEY, {}))
+
+
+def enable_cocktail_mix(environment: Environment):
+    user_classes = endpoint_user_classes(environment)
+    if not user_classes:
+        return False
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        for user_class in user_classes:
+            user_class.tasks = [task if isinstance(task, type) and issubclass(task, TaskSet)
+                                else counted_task(task, user_class.__name__) for task in user_class.tasks]
+        events.report_to_master.add_listener(on_report_to_master)
+    return True
+
+
+def target_shares(user_classes, total_users=None):
+    # endpoints that all hold a target rate are mixed by rate, otherwise by the users locust gives each of them
+    if all(user_class.target_rps for user_class in user_classes):
+        total_rps = sum(user_class.target_rps for user_class in user_classes)
+        return [user_class.target_rps / total_rps for user_class in user_classes]
+    fixed_users = sum(user_class.fixed_count for user_class in user_classes if user_class.fixed_count)
+    total_weight = sum(user_class.weight for user_class in user_classes if not user_class.fixed_count)
+    weighted_users = max(0, (total_users or fixed_users + total_weight) - fixed_users)
+    users = [user_class.fixed_count or weighted_users * user_class.weight / total_weight
+             for user_class in user_classes]
+    return [n / sum(users) if sum(users) else 0 for n in users]
+
+
+def mix_rows(environment: Environment):
+    user_classes = endpoint_user_classes(environment)
+    total = environment.stats.total
+    elapsed = (total.last_request_timestamp or total.start_time) - total.start_time
+    total_tasks = sum(task_counts[user_class.__name__] for user_class in user_classes)
+    for user_class, target_share in zip(user_classes, target_shares(user_classes,
+                                                                    environment.parsed_options.num_users)):
+        tasks = task_counts[user_class.__name__]
+        realized_share = tasks / total_tasks if total_tasks else 0
+        yield [
+            user_class.endpoint_index,
+            user_class.__name__,
+            user_class.weight,
+            user_class.fixed_count or "",
+            user_class.target_rps or "",
+            round(target_share, 4),
+            tasks,
+            round(tasks / elapsed, 2) if elapsed > 0 else 0,
+            round(realized_share, 4),
+            round(realized_share - target_share, 4),
+        ]
+
+
+def mix_csv(environment: Environment, writer):
+    writer.writerow(["Endpoint", "User Class", "Weight", "Fixed Users", "Target RPS", "Target Share", "Tasks",
+                     "Realized RPS", "Realized Share", "Share Delta"])
+    writer.writerows(mix_rows(environment))
@@ -1,28 +1,120 @@
 import csv
+import logging
 import os
 from pathlib import Path
 
+from flask import Response, request
+from locust import events
 from locust.env import Environment, MasterRunner
 from locust.html import get_html_report
+from locust.runners import WorkerRunner
 from locust.stats import StatsCSV, PERCENTILES_TO_REPORT
 
-from src.olaf.s3_uploader import upload_session_dir
+from src.constants import REPORTS_WRITTEN_MARKER
+from src.olaf.arrival_schedule import add_arrival_args, apply_arrival_schedule
+from src.olaf.batch_events import enable_batch_entries, entry_counts, batch_entries_csv
+from src.olaf.client_registry import on_report_to_master, pool_stats_aggregator
+from src.olaf.cocktail_mix import enable_cocktail_mix, endpoint_user_classes, mix_csv, mix_rows
+from src.olaf.generator_overhead import (add_overhead_args, enable_generator_overhead, overhead_csv, overhead_rows,
+                                         is_generator_saturated)
+from src.olaf.raw_timing_log import add_raw_timing_args, enable_raw_timing_log
+from src.olaf.latency_histograms import add_histogram_args, enable_latency_histograms, latency_histograms
+from src.olaf.latency_correction import (add_correction_args, enable_latency_correction,
+                                         is_latency_correction_enabled, corrected_rows, corrected_html_table)
+from src.olaf.s3_uploader import start_session_upload
+from src.olaf.session_bundle import (SESSION_BUNDLE_ROUTE, WORKER_TOKEN_HEADER, add_bundle_args, bundle_refusal,
+                                     build_session_bundle)
+from src.olaf.spawn_stats import enable_spawn_stats, spawn_csv
+logger = logging.getLogger()
 
 
 def add_session_dir_arg(parser):
     parser.add_argument("--session_dir", type=str, default="", help="path to session directory")
 
 
+def throughput_csv(environment: Environment, writer):
+    writer.writerow(["Type", "Name", "Requests/s", "Bytes/s"])
+    for entry in environment.stats.entries.values():
+        writer.writerow([entry.method, entry.name, round(entry.total_rps, 2),
+                         round(entry.total_rps * entry.avg_content_length, 2)])
+
+
+def on_locust_init(environment: Environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(pool_stats_aggregator.on_worker_report)
+        if environment.web_ui:
+            @environment.web_ui.app.route("/olaf/pool_stats")
+            def pool_stats():
+                return {"pool_stats": pool_stats_aggregator.rows()}
+
+            @environment.web_ui.app.route("/olaf/generator_overhead")
+            def generator_overhead():
+                if not environment.parsed_options.generator_overhead:
+                    return {"enabled": False}
+                return {"enabled": True, "saturated": is_generator_saturated(environment),
+                        "rows": list(overhead_rows(environment))}
+
+            @environment.web_ui.app.route("/olaf/cocktail_mix")
+            def cocktail_mix():
+                return {"cocktail_mix": list(mix_rows(environment))}
+
+            if environment.parsed_options.remote_workers:
+                @environment.web_ui.app.route(SESSION_BUNDLE_ROUTE)
+                def session_bundle():
+                    # remote workers pull the locustfile, session params and worker options from here
+                    refusal = bundle_refusal(request.headers.get(WORKER_TOKEN_HEADER))
+                    if refusal:
+                        logger.warning(f"session bundle refused: {refusal}")
+                        return Response(refusal, status=403)
+                    return Response(build_session_bundle(environment.parsed_options), mimetype="application/gzip")
+    if isinstance(environment.runner, WorkerRunner):
+        events.report_to_master.add_listener(on_report_to_master)
+    enable_spawn_stats(environment)
+    enable_batch_entries(environment)
+    apply_arrival_schedule(environment)
+    enable_generator_overhead(environment)
+    enable_cocktail_mix(environment)
+    enable_latency_correction(environment)
+    enable_latency_histograms(environment)
+    enable_raw_timing_log(environment)
+
+
+_event_handlers_registered = False
+
+
+def register_event_handlers():
+    # user modules can be imported together (cocktail), so the listeners must only be added once per process
+    global _event_handlers_registered
+    if _event_handlers_registered:
+        return
+    _event_handlers_registered = True
+    events.init_command_line_parser.add_listener(add_session_dir_arg)
+    events.init_command_line_parser.add_listener(add_bundle_args)
+    events.init_command_line_parser.add_listener(add_arrival_args)
+    events.init_command_line_parser.add_listener(add_correction_args)
+    events.init_command_line_parser.add_listener(add_histogram_args)
+    events.init_command_line_parser.add_listener(add_raw_timing_args)
+    events.init_command_line_parser.add_listener(add_overhead_args)
+    events.init.add_listener(on_locust_init)
+    events.quitting.add_listener(on_test_quit)
+
+
 def on_test_quit(environment: Environment, **kwargs):
     if isinstance(environment.runner, MasterRunner):
         session_path = Path(environment.parsed_options.session_dir)
+        co_correction = is_latency_correction_enabled(environment.parsed_options)
         html_report = get_html_report(environment, show_download_link=False)
+        if co_correction:
+            html_report = html_report.replace("</body>", corrected_html_table() + "</body>", 1)
         with open(os.path.join(session_path, "report.html"), mode="w", encoding="utf-8") as f:
             f.write(html_report)
 
         stats = StatsCSV(environment, percentiles_to_report=PERCENTILES_TO_REPORT)
         with open(os.path.join(session_path, "csv_summary.csv"), "w") as f:
-            stats.requests_csv(csv.writer(f))
+            writer = csv.writer(f)
+            stats.requests_csv(writer)
+            if co_correction:
+                writer.writerows(corrected_rows())
 
         with open(os.path.join(session_path, "csv_exception.csv"), "w") as f:
             stats.exceptions_csv(csv.writer(f))
@@ -30,4 +122,28 @@ def on_test_quit(environment: Environment, **kwargs):
         with open(os.path.join(session_path, "csv_failures.csv"), "w") as f:
             stats.failures_csv(csv.writer(f))
 
-        upload_session_dir(session_path)
+        with open(os.path.join(session_path, "csv_pool_stats.csv"), "w") as f:
+            pool_stats_aggregator.to_csv(csv.writer(f))
+
+        with open(os.path.join(session_path, "csv_throughput.csv"), "w") as f:
+            throughput_csv(environment, csv.writer(f))
+
+        with open(os.path.join(session_path, "csv_user_spawn.csv"), "w") as f:
+            spawn_csv(csv.writer(f))
+
+        if entry_counts:
+            with open(os.path.join(session_path, "csv_batch_entries.csv"), "w") as f:
+                batch_entries_csv(environment, csv.writer(f))
+
+        if endpoint_user_classes(environment):
+            with open(os.path.join(session_path, "csv_cocktail_mix.csv"), "w") as f:
+                mix_csv(environment, csv.writer(f))
+
+        if environment.parsed_options.generator_overhead:
+            with open(os.path.join(session_path, "csv_generator_overhead.csv"), "w") as f:
+                overhead_csv(environment, csv.writer(f))
+
+        latency_histograms.write_session_files(session_path)
+        (session_path / REPORTS_WRITTEN_MARKER).touch()
+
+        start_session_upload(session_path)
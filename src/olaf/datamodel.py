@@ -30,6 +30,12 @@ def validate_empty_string(some_string: str):
     return some_string
 
 
+def validate_batch_value(batch_value, values):
+    if values.get("batch_mode"):
+        assert batch_value is not None, "batch value is required in batch mode"
+    return batch_value
+
+
 def json_serialize_params(parsed_json):
     if not isinstance(parsed_json, str):
         parsed_json = json.dumps(parsed_json)
@@ -63,7 +69,7 @@ class UserBaseParams(BaseModel):
         extra = "forbid"
 
 
-ElasticsearchNt = namedtuple("ElasticsearchNt", "url access_key secret_key index_name query_json")
+ElasticsearchNt = namedtuple("ElasticsearchNt", "url access_key secret_key index_name query_json max_pool_connections")
 
 
 class ElasticsearchUserParams(UserBaseParams):
@@ -73,12 +79,13 @@ class ElasticsearchUserParams(UserBaseParams):
     secret_key: SecretStr
     index_name: str
     query_json: Json[List]
+    max_pool_connections: conint(ge=1, le=1000) = 100
 
     validate_json = validator(*["query_json"], allow_reuse=True, pre=True)(json_serialize_params)
     _validate_string = validator(*["index_name"], allow_reuse=True)(validate_empty_string)
 
 
-MongoDbNt = namedtuple("MongoDbNt", "mongo_url, db_name, collection_name, query_json")
+MongoDbNt = namedtuple("MongoDbNt", "mongo_url, db_name, collection_name, query_json, max_pool_connections")
 
 
 class MongoDBUserParams(UserBaseParams):
@@ -87,24 +94,26 @@ class MongoDBUserParams(UserBaseParams):
     db_name: str
     collection_name: str
     query_json: Json[List]
+    max_pool_connections: conint(ge=1, le=1000) = 100
 
     validate_json = validator(*["query_json"], allow_reuse=True, pre=True)(json_serialize_params)
     _validate_query_json = validator("query_json", allow_reuse=True)(validate_empty_query_json)
     _validate_string = validator(*["mongo_url", "db_name", "collection_name"], allow_reuse=True)(validate_empty_string)
 
 
-RestGetNt = namedtuple("RestGetNt", "url header_json")
+RestGetNt = namedtuple("RestGetNt", "url header_json engine")
 
 
 class RestGetUserParams(UserBaseParams):
     kind: Literal["rest_get"] = "rest_get"
     url: HttpUrl
     header_json: Json[Dict]
+    engine: Literal["requests", "fasthttp"] = "requests"
 
     _validate_json = validator(*["header_json"], allow_reuse=True, pre=True)(json_serialize_params)
 
 
-RestPostNt = namedtuple("RestPostNt", "url header_json query_json")
+RestPostNt = namedtuple("RestPostNt", "url header_json query_json engine")
 
 
 class RestPostUserParams(UserBaseParams):
@@ -112,13 +121,15 @@ class RestPostUserParams(UserBaseParams):
     url: HttpUrl
     header_json: Json[Dict]
     query_json: Json[List]
+    engine: Literal["requests", "fasthttp"] = "requests"
 
     _validate_json = validator(*["query_json", "header_json"], allow_reuse=True, pre=True)(json_serialize_params)
     _validate_query_json = validator("query_json", allow_reuse=True)(validate_empty_query_json)
 
 
 SagemakerNt = namedtuple("SagemakerNt", "endpoint, predictor_type, input_serializer, output_deserializer, aws_region, "
-                                        "access_key, secret_key, session_token, multi_model, batch_mode, batch_value, query_json")
+                                        "access_key, secret_key, session_token, multi_model, batch_mode, batch_value, query_json, "
+                                        "max_pool_connections")
 
 
 class SagemakerUserParams(UserBaseParams):
@@ -136,6 +147,7 @@ class SagemakerUserParams(UserBaseParams):
     batch_value: conint(ge=2, le=100) = None
     input_serializer: str
     output_deserializer: str
+    max_pool_connections: conint(ge=1, le=1000) = 100
 
     _validate_json = validator(*["query_json"], allow_reuse=True, pre=True)(json_serialize_params)
     _validate_query_json = validator("query_json", allow_reuse=True)(validate_empty_query_json)
@@ -165,7 +177,8 @@ class OlafScheduleParams(BaseModel):
 
 
 SqsNt = namedtuple("SqsNt", "sqs_name, aws_region, access_key, secret_key, session_token,"
-                            "query_json, message_attribute_json, custom_load_shape_params")
+                            "query_json, message_attribute_json, custom_load_shape_params, max_pool_connections,"
+                            "batch_mode, batch_value, partial_failure_accounting")
 
 
 class SQSUserParams(UserBaseParams):
@@ -178,6 +191,10 @@ class SQSUserParams(UserBaseParams):
     query_json: Json[List]
     message_attribute_json: Dict
     custom_load_shape_params: Union[None, OlafScheduleParams]
+    max_pool_connections: conint(ge=1, le=1000) = 100
+    batch_mode: bool = False
+    batch_value: conint(ge=2, le=10) = None
+    partial_failure_accounting: bool = False
 
     _validate_json = validator(*["query_json", "message_attribute_json"], allow_reuse=True, pre=True) \
         (json_serialize_params)
@@ -187,10 +204,12 @@ class SQSUserParams(UserBaseParams):
         (validate_message_attribute_json)
     _validate_string = validator(*["access_key", "secret_key", "aws_region", "sqs_name",
                                    ], pre=True, allow_reuse=True)(validate_empty_string)
+    _validate_batch_value = validator("batch_value", always=True, allow_reuse=True)(validate_batch_value)
 
 
 SnsNt = namedtuple("SnsNt", "sns_arn, aws_region, access_key, secret_key, session_token,"
-                            "query_json, message_attribute_json, custom_load_shape_params")
+                            "query_json, message_attribute_json, custom_load_shape_params, max_pool_connections,"
+                            "batch_mode, batch_value, partial_failure_accounting")
 
 
 class SNSUserParams(UserBaseParams):
@@ -203,6 +222,10 @@ class SNSUserParams(UserBaseParams):
     query_json: Json[List]
     message_attribute_json: Dict
     custom_load_shape_params: Union[None, OlafScheduleParams]
+    max_pool_connections: conint(ge=1, le=1000) = 100
+    batch_mode: bool = False
+    batch_value: conint(ge=2, le=10) = None
+    partial_failure_accounting: bool = False
 
     _validate_json = validator(*["query_json", "message_attribute_json"], allow_reuse=True, pre=True)(
         json_serialize_params)
@@ -211,10 +234,11 @@ class SNSUserParams(UserBaseParams):
         (validate_message_attribute_json)
     _validate_string = validator(*["access_key", "secret_key", "aws_region", "sns_arn",
                                    ], pre=True, allow_reuse=True)(validate_empty_string)
+    _validate_batch_value = validator("batch_value", always=True, allow_reuse=True)(validate_batch_value)
 
 
 LambdaNt = namedtuple("LambdaNt", "lambda_arn, aws_region, access_key, secret_key, session_token, "
-                                  "query_json")
+                                  "query_json, max_pool_connections")
 
 
 class LambdaUserParams(UserBaseParams):
@@ -225,6 +249,7 @@ class LambdaUserParams(UserBaseParams):
     aws_region: str  # todo enum
     lambda_arn: str
     query_json: Json[List]
+    max_pool_connections: conint(ge=1, le=1000) = 100
 
     _validate_json = validator(*["query_json"], allow_reuse=True, pre=True) \
         (json_serialize_params)
@@ -243,7 +268,8 @@ class S3UserParams(UserBaseParams):
 
 
 KafkaProducerNt = namedtuple("KafkaProducerNt", "bootstrap_server, ssl_username, ssl_password, topic_name, "
-                                                "kafka_config, kafka_producer_config, query_json")
+                                                "kafka_config, kafka_producer_config, query_json, producer_mode, "
+                                                "max_in_flight")
 
 
 class KafkaProducerUserParams(UserBaseParams):
@@ -255,6 +281,8 @@ class KafkaProducerUserParams(UserBaseParams):
     kafka_config: Json[Dict]
     kafka_producer_config: Json[Dict]
     query_json: Json[List]
+    producer_mode: Literal["sync", "async"] = "sync"
+    max_in_flight: conint(ge=1, le=100000) = 1000
 
     _validate_json = validator(*["query_json", "kafka_config", "kafka_producer_config"], allow_reuse=True, pre=True) \
         (json_serialize_params)
@@ -265,7 +293,7 @@ class KafkaProducerUserParams(UserBaseParams):
 
 
 RedisStreamNt = namedtuple("RedisStreamNt", "redis_type, host, port, username, password, stream_name, "
-                                            "query_json")
+                                            "query_json, pipeline_depth, maxlen")
 
 
 class RedisStreamUserParams(UserBaseParams):
@@ -277,6 +305,8 @@ class RedisStreamUserParams(UserBaseParams):
     password: SecretStr = ""
     stream_name: str
     query_json: Json[List]
+    pipeline_depth: conint(ge=1, le=10000) = 1
+    maxlen: conint(ge=1) = None
 
     _validate_json = validator(*["query_json",], allow_reuse=True, pre=True) \
         (json_serialize_params)
@@ -285,7 +315,8 @@ class RedisStreamUserParams(UserBaseParams):
     _validate_string = validator(*["host",  "stream_name",
                                    ], pre=True, allow_reuse=True)(validate_empty_string)
 
-PineConeVectorSearchNt = namedtuple("PineConeVectorSearchNt", "api_key, environment_name, index_name, query_json")
+PineConeVectorSearchNt = namedtuple("PineConeVectorSearchNt", "api_key, environment_name, index_name, query_json, "
+                                                              "max_in_flight")
 
 class PineConeVectorSearchUserParams(UserBaseParams):
     kind: Literal['pinecone_vector_search'] = 'pinecone_vector_search'
@@ -293,18 +324,37 @@ class PineConeVectorSearchUserParams(UserBaseParams):
     environment_name: str
     index_name: str
     query_json: Json[List]
+    max_in_flight: conint(ge=1, le=1000) = 1
 
     _validate_json = validator(*["query_json", ], allow_reuse=True, pre=True) \
         (json_serialize_params)
     _validate_string = validator(*["environment_name", "index_name"], allow_reuse=True, pre=True) \
         (validate_empty_string)
 
+CocktailEndpointNt = namedtuple("CocktailEndpointNt", "resource_args, weight, fixed_count, target_rps")
+
+
+class CocktailEndpointMix(BaseModel):
+    weight: conint(ge=1, le=1000) = 1
+    fixed_count: conint(ge=1, le=500) = None
+    target_rps: confloat(gt=0, le=100000) = None
+
+
 class CocktailUserParams(UserBaseParams):
     kind: Literal["cocktail"] = "cocktail"
     user_resources: List[Union[
         ElasticsearchUserParams, MongoDBUserParams, RestGetUserParams, RestPostUserParams,
         SagemakerUserParams, SQSUserParams, SNSUserParams, LambdaUserParams
     ]]
+    endpoint_mix: List[CocktailEndpointMix] = []
+
+    @validator("endpoint_mix", always=True, allow_reuse=True)
+    def validate_endpoint_mix(cls, endpoint_mix, values):
+        user_resources = values.get("user_resources", [])
+        if not endpoint_mix:
+            return [CocktailEndpointMix() for _ in user_resources]
+        assert len(endpoint_mix) == len(user_resources), "every cocktail endpoint needs its own mix"
+        return endpoint_mix
 
 RedisVectorSearchNt = namedtuple("RedisVectorSearchNt", "host, port, password, index_name, query_json")
 
@@ -0,0 +1,143 @@
+import logging
+import time
+from functools import wraps
+
+from gevent.local import local
+from locust import events, TaskSet
+from locust.env import Environment
+from locust.runners import MasterRunner
+from locust.stats import RequestStats, StatsEntry, sort_stats
+
+OVERHEAD_STATS_KEY = "olaf_generator_overhead"
+SCHEDULING_LAG = "scheduling_lag"
+PREPARATION = "preparation"
+OVERHEAD_PERCENTILE = 0.95
+
+logger = logging.getLogger()
+
+overhead_stats = RequestStats()
+_user_local = local()
+
+
+def add_overhead_args(parser):
+    parser.add_argument("--generator_overhead", action="store_true", default=False,
+                        help="record scheduling lag and request preparation time of the load generator")
+    parser.add_argument("--overhead_threshold_ms", type=float, default=5.0,
+                        help="p95 scheduling lag or preparation time above which the generator is flagged")
+
+
+def tracked_wait_time(wait_time):
+    def wait(user):
+        seconds = wait_time(user)
+        # the task after this wait should start at this time, later is lag of the gevent hub
+        _user_local.expected_start = time.perf_counter() + seconds
+        return seconds
+
+    return wait
+
+
+def tracked_task(task_fn):
+    @wraps(task_fn)
+    def run(user):
+        task_start = time.perf_counter()
+        expected_start = getattr(_user_local, "expected_start", None)
+        if expected_start is not None:
+            overhead_stats.log_request(SCHEDULING_LAG, type(user).__name__,
+                                       max(0.0, task_start - expected_start) * 1000, 0)
+            _user_local.expected_start = None
+        _user_local.last_mark = task_start
+        try:
+            return task_fn(user)
+        finally:
+            _user_local.last_mark = None
+
+    return run
+
+
+def on_request(request_type, name, response_time, **kwargs):
+    # time between the task starting (or the previous request of the task ending) and this client call starting,
+    # requests fired outside a task (spawns, callbacks, helper greenlets) have nothing to be measured against
+    last_mark = getattr(_user_local, "last_mark", None)
+    if last_mark is None:
+        return
+    now = time.perf_counter()
+    call_start = now - response_time / 1000
+    overhead_stats.log_request(PREPARATION, f"{request_type} {name}", max(0.0, call_start - last_mark) * 1000, 0)
+    _user_local.last_mark = now
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[OVERHEAD_STATS_KEY] = overhead_stats.serialize_stats()
+
+
+def on_worker_report(client_id, data, **kwargs):
+    for stats_data in data.get(OVERHEAD_STATS_KEY, []):
+        entry = StatsEntry.unserialize(stats_data)
+        overhead_stats.get(entry.name, entry.method).extend(entry)
+
+
+def track_user_class(user_class):
+    if getattr(user_class, "_olaf_overhead_tracked", False):
+        return
+    user_class._olaf_overhead_tracked = True
+    if user_class.wait_time is not None:
+        user_class.wait_time = tracked_wait_time(user_class.wait_time)
+    user_class.tasks = [task if isinstance(task, type) and issubclass(task, TaskSet) else tracked_task(task)
+                        for task in user_class.tasks]
+
+
+def enable_generator_overhead(environment: Environment):
+    if not environment.parsed_options.generator_overhead:
+        return False
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        # must follow the arrival schedule, which replaces wait_time itself
+        for user_class in environment.user_classes:
+            track_user_class(user_class)
+        events.request.add_listener(on_request)
+        events.report_to_master.add_listener(on_report_to_master)
+    return True
+
+
+def overhead_rows(environment: Environment):
+    threshold = environment.parsed_options.overhead_threshold_ms
+    for entry in sort_stats(overhead_stats.entries):
+        p95 = entry.get_response_time_percentile(OVERHEAD_PERCENTILE)
+        share = ""
+        if entry.method == PREPARATION:
+            # preparation against the latency reported for the same requests
+            request_type, name = entry.name.split(" ", 1)
+            stats_entry = environment.stats.entries.get((name, request_type))
+            total = entry.avg_response_time + (stats_entry.avg_response_time if stats_entry else 0)
+            share = round(entry.avg_response_time / total, 4) if total else 0
+        yield [
+            entry.method,
+            entry.name,
+            entry.num_requests,
+            round(entry.avg_response_time, 3),
+            entry.median_response_time,
+            p95,
+            entry.get_response_time_percentile(0.99),
+            entry.max_response_time,
+            share,
+            p95 > threshold,
+        ]
+
+
+def overhead_csv(environment: Environment, writer):
+    writer.writerow(["Type", "Name", "Count", "Average (ms)", "50% (ms)", "95% (ms)", "99% (ms)", "Max (ms)",
+                     "Share of Latency", "Over Threshold"])
+    rows = list(overhead_rows(environment))
+    writer.writerows(rows)
+    flagged = [f"{row[0]} {row[1]}" for row in rows if row[-1]]
+    if flagged:
+        logger.warning(f"load generator overhead above {environment.parsed_options.overhead_threshold_ms}ms "
+                       f"(p95) for {', '.join(flagged)}, latency of these requests includes generator saturation")
+    return flagged
+
+
+def is_generator_saturated(environment: Environment) -> bool:
+    threshold = environment.parsed_options.overhead_threshold_ms
+    return any(entry.get_response_time_percentile(OVERHEAD_PERCENTILE) > threshold
+               for entry in overhead_stats.entries.values() if entry.num_requests)
@@ -0,0 +1,142 @@
+import math
+from array import array
+from typing import Iterator, List, Tuple
+
+# values are recorded as integer microseconds, up to an hour
+HIGHEST_TRACKABLE_VALUE = 3_600_000_000
+
+
+class HdrHistogram:
+    """
+    High dynamic range histogram after Gil Tene's HdrHistogram, every recorded value is kept with
+    `significant_figures` decimal digits of precision over the whole trackable range.
+    """
+
+    def __init__(self, significant_figures: int = 3, highest_trackable_value: int = HIGHEST_TRACKABLE_VALUE):
+        assert 1 <= significant_figures <= 5, "significant figures must be between 1 and 5"
+        self.significant_figures = significant_figures
+        self.highest_trackable_value = highest_trackable_value
+
+        self.sub_bucket_count_magnitude = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count >> 1
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+
+        self.bucket_count = 1
+        smallest_untrackable_value = self.sub_bucket_count
+        while smallest_untrackable_value <= highest_trackable_value:
+            smallest_untrackable_value <<= 1
+            self.bucket_count += 1
+
+        self.counts = array("Q", bytes(8 * (self.bucket_count + 1) * self.sub_bucket_half_count))
+        # indices with a count, so reports and resets touch those rather than every slot of counts
+        self.touched = set()
+        self.total_count = 0
+        self.max_value = 0
+
+    def _counts_index(self, value: int) -> int:
+        bucket_index = (value | self.sub_bucket_mask).bit_length() - self.sub_bucket_count_magnitude
+        sub_bucket_index = value >> bucket_index
+        return (((bucket_index + 1) << self.sub_bucket_half_count_magnitude)
+                + sub_bucket_index - self.sub_bucket_half_count)
+
+    def _value_range(self, index: int) -> Tuple[int, int]:
+        # lowest and highest value counted at index
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        lowest = sub_bucket_index << bucket_index
+        return lowest, lowest + (1 << bucket_index) - 1
+
+    def record(self, value: int, count: int = 1):
+        value = min(max(int(value), 0), self.highest_trackable_value)
+        index = self._counts_index(value)
+        self.counts[index] += count
+        self.touched.add(index)
+        self.total_count += count
+        if value > self.max_value:
+            self.max_value = value
+
+    def reset(self):
+        for index in self.touched:
+            self.counts[index] = 0
+        self.touched.clear()
+        self.total_count = 0
+        self.max_value = 0
+
+    def to_sparse(self) -> List[List[int]]:
+        return [[index, count] for index, count in self._nonzero()]
+
+    def add_sparse(self, sparse: List[List[int]], max_value: int):
+        for index, count in sparse:
+            self.counts[index] += count
+            self.touched.add(index)
+            self.total_count += count
+        self.max_value = max(self.max_value, max_value)
+
+    def _nonzero(self) -> Iterator[Tuple[int, int]]:
+        for index in sorted(self.touched):
+            if self.counts[index]:
+                yield index, self.counts[index]
+
+    def value_at_percentile(self, percentile: float) -> int:
+        if not self.total_count:
+            return 0
+        count_at_percentile = max(1, math.ceil(min(percentile, 100.0) / 100 * self.total_count))
+        cumulative = 0
+        for index, count in self._nonzero():
+            cumulative += count
+            if cumulative >= count_at_percentile:
+                return min(self._value_range(index)[1], self.max_value)
+        return self.max_value
+
+    def mean_and_stddev(self) -> Tuple[float, float]:
+        if not self.total_count:
+            return 0.0, 0.0
+        total = 0.0
+        total_squares = 0.0
+        for index, count in self._nonzero():
+            lowest, highest = self._value_range(index)
+            median_value = (lowest + highest) / 2
+            total += median_value * count
+            total_squares += median_value * median_value * count
+        mean = total / self.total_count
+        return mean, math.sqrt(max(total_squares / self.total_count - mean * mean, 0.0))
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5) -> Iterator[Tuple[int, float, int]]:
+        # (value, percentile, total count) rows, ticks get denser each time the distance to 100% halves
+        if not self.total_count:
+            return
+        buckets = list(self._nonzero())
+        percentile = 0.0
+        cumulative = 0
+        ndx = -1
+        while ndx < len(buckets) - 1 or cumulative < self.total_count:
+            count_at_percentile = max(1, math.ceil(percentile / 100 * self.total_count))
+            while cumulative < count_at_percentile:
+                ndx += 1
+                cumulative += buckets[ndx][1]
+            if cumulative == self.total_count:
+                break
+            value = min(self._value_range(buckets[ndx][0])[1], self.max_value)
+            yield value, percentile / 100, cumulative
+            half_distance = math.floor(math.log2(100 / (100 - percentile))) + 1
+            percentile += 100 / (ticks_per_half_distance * 2 ** half_distance)
+        yield self.max_value, 1.0, self.total_count
+
+    def write_hgrm(self, f, value_scale: float = 1000.0):
+        # same layout as HdrHistogram's outputPercentileDistribution, values scaled to milliseconds
+        f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        for value, percentile, total_count in self.percentile_distribution():
+            if percentile < 1.0:
+                f.write(f"{value / value_scale:12.3f} {percentile:2.12f} {total_count:10d} "
+                        f"{1 / (1 - percentile):14.2f}\n")
+            else:
+                f.write(f"{value / value_scale:12.3f} {percentile:2.12f} {total_count:10d}\n")
+        mean, stddev = self.mean_and_stddev()
+        f.write(f"#[Mean    = {mean / value_scale:12.3f}, StdDeviation   = {stddev / value_scale:12.3f}]\n")
+        f.write(f"#[Max     = {self.max_value / value_scale:12.3f}, Total count    = {self.total_count:12d}]\n")
+        f.write(f"#[Buckets = {self.bucket_count:12d}, SubBuckets     = {self.sub_bucket_count:12d}]\n")
@@ -0,0 +1,102 @@
+import argparse
+import json
+import re
+import sys
+import time
+from subprocess import run
+
+import psutil
+
+from src.constants import ROOT_PATH
+
+IMPORT_REPORT_FILENAME = "import_report.json"
+TOP_PACKAGES = 10
+
+USER_MODULES = {
+    "rest_get": "src.olaf.locust_users.rest_get_user",
+    "rest_get_fasthttp": "src.olaf.locust_users.rest_get_fasthttp_user",
+    "rest_post": "src.olaf.locust_users.rest_post_user",
+    "rest_post_fasthttp": "src.olaf.locust_users.rest_post_fasthttp_user",
+    "elasticsearch": "src.olaf.locust_users.elasticsearch_user",
+    "mongo_db": "src.olaf.locust_users.mongo_user",
+    "sagemaker": "src.olaf.locust_users.sagemaker_user",
+    "sqs": "src.olaf.locust_users.sqs_user",
+    "sns": "src.olaf.locust_users.sns_user",
+    "lambda": "src.olaf.locust_users.lambda_user",
+    "kafka_producer": "src.olaf.locust_users.kafka_producer_user",
+    "redis_stream": "src.olaf.locust_users.redis_stream_producer_user",
+    "redis_vector_search": "src.olaf.locust_users.redis_vector_search",
+    "pinecone_vector_search": "src.olaf.locust_users.pinecone_vector_search",
+}
+
+# "import time:      1234 |      5678 |   package.module" as written by python -X importtime
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def rss_mb() -> float:
+    return round(psutil.Process().memory_info().rss / 2 ** 20, 1)
+
+
+def timed_phase(name, load) -> dict:
+    # wall time, resident memory and modules a phase of start-up adds to the process
+    modules_before = set(sys.modules)
+    rss_before = rss_mb()
+    started_at = time.perf_counter()
+    load()
+    new_modules = set(sys.modules) - modules_before
+    return {
+        "phase": name,
+        "seconds": round(time.perf_counter() - started_at, 3),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "modules": len(new_modules),
+        "packages": sorted({module.split(".")[0] for module in new_modules}),
+    }
+
+
+def parse_import_times(stderr: str):
+    # cumulative seconds of every top level import, nested imports are counted within their importer
+    packages = {}
+    for match in IMPORT_TIME_LINE.finditer(stderr):
+        if len(match.group(3)) == 1:
+            package = match.group(4).split(".")[0]
+            packages[package] = packages.get(package, 0) + int(match.group(2)) / 1e6
+    return packages
+
+
+def user_import_report(kind) -> dict:
+    # a fresh interpreter per user type, so nothing an earlier user type imported is counted as cached
+    code = "import locust, importlib, sys; importlib.import_module(sys.argv[1])"
+    completed = run([sys.executable, "-X", "importtime", "-c", code, USER_MODULES[kind]],
+                    cwd=ROOT_PATH.parent, capture_output=True, text=True)
+    if completed.returncode:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed"}
+    packages = parse_import_times(completed.stderr)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:TOP_PACKAGES]
+    return {
+        "seconds": round(sum(packages.values()), 3),
+        "heaviest_packages": {package: round(seconds, 3) for package, seconds in heaviest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="time the imports a worker of every user type starts with")
+    parser.add_argument("kinds", nargs="*", default=list(USER_MODULES), choices=list(USER_MODULES))
+    parser.add_argument("--output", type=str, default=None, help="json file the report is written to")
+    options = parser.parse_args()
+
+    report = {}
+    for kind in options.kinds:
+        report[kind] = user_import_report(kind)
+        if "error" in report[kind]:
+            print(f"{kind:<24} {report[kind]['error']}")
+        else:
+            heaviest = ", ".join(f"{package} {seconds:.2f}s"
+                                 for package, seconds in list(report[kind]["heaviest_packages"].items())[:3])
+            print(f"{kind:<24} {report[kind]['seconds']:>7.2f}s  {heaviest}")
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import html
+import time
+from itertools import chain
+
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner
+from locust.stats import RequestStats, StatsEntry, sort_stats, PERCENTILES_TO_REPORT
+
+from src.olaf.arrival_schedule import get_intended_start
+
+CORRECTED_STATS_KEY = "olaf_corrected_stats"
+CORRECTED_TYPE_SUFFIX = " (corrected)"
+
+corrected_stats = RequestStats()
+
+
+def add_correction_args(parser):
+    parser.add_argument("--co_correction", action="store_true", default=False,
+                        help="also record latency from the scheduled start of every request")
+
+
+def on_request(request_type, name, response_time, response_length, exception=None, **kwargs):
+    # a request that waited behind a late schedule is charged for the wait, outside a scheduled task
+    # (callbacks, helper greenlets) the measured response time is kept as is
+    intended_start = get_intended_start()
+    if intended_start is not None:
+        response_time = max(response_time, (time.perf_counter() - intended_start) * 1000)
+    corrected_stats.log_request(request_type, name, response_time, response_length)
+    if exception:
+        corrected_stats.log_error(request_type, name, exception)
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[CORRECTED_STATS_KEY] = {
+        "stats": corrected_stats.serialize_stats(),
+        "stats_total": corrected_stats.total.get_stripped_report(),
+    }
+
+
+def on_worker_report(client_id, data, **kwargs):
+    if CORRECTED_STATS_KEY not in data:
+        return
+    for stats_data in data[CORRECTED_STATS_KEY]["stats"]:
+        entry = StatsEntry.unserialize(stats_data)
+        corrected_stats.get(entry.name, entry.method).extend(entry)
+    corrected_stats.total.extend(StatsEntry.unserialize(data[CORRECTED_STATS_KEY]["stats_total"]))
+
+
+def is_latency_correction_enabled(options) -> bool:
+    # without an arrival schedule there is no intended start to correct against
+    return options.co_correction and options.arrival_mode != "closed"
+
+
+def enable_latency_correction(environment: Environment):
+    if not is_latency_correction_enabled(environment.parsed_options):
+        return False
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        events.request.add_listener(on_request)
+        events.report_to_master.add_listener(on_report_to_master)
+    return True
+
+
+def corrected_rows():
+    for entry in chain(sort_stats(corrected_stats.entries), [corrected_stats.total]):
+        yield [
+            f"{entry.method or ''}{CORRECTED_TYPE_SUFFIX}",
+            entry.name,
+            entry.num_requests,
+            entry.num_failures,
+            entry.median_response_time,
+            entry.avg_response_time,
+            entry.min_response_time or 0,
+            entry.max_response_time,
+            entry.avg_content_length,
+            entry.total_rps,
+            entry.total_fail_per_sec,
+        ] + [entry.get_response_time_percentile(p) if entry.num_requests else "N/A"
+             for p in PERCENTILES_TO_REPORT]
+
+
+def corrected_html_table() -> str:
+    header = ["Type", "Name", "# Requests", "# Fails", "Median", "Average", "Min", "Max", "Average size", "RPS",
+              "Failures/s"] + [f"{p * 100:g}%ile" for p in PERCENTILES_TO_REPORT]
+    rows = "".join("<tr>" + "".join(f"<td>{html.escape(str(value))}</td>" for value in row) + "</tr>"
+                   for row in corrected_rows())
+    return (f'<div class="requests container"><h2>Coordinated omission corrected response times (ms)</h2>'
+            f'<table><thead><tr>{"".join(f"<th>{h}</th>" for h in header)}</tr></thead>'
+            f'<tbody>{rows}</tbody></table></div>')
@@ -0,0 +1,94 @@
+import csv
+import os
+import re
+from typing import Dict, Tuple
+
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner
+
+from src.olaf.hdr_histogram import HdrHistogram
+
+HISTOGRAMS_KEY = "olaf_hdr_histograms"
+HGRM_DIRNAME = "hgrm"
+HDR_PERCENTILES = [50, 90, 99, 99.9, 99.99]
+TOTAL_NAME = "Aggregated"
+
+
+def add_histogram_args(parser):
+    parser.add_argument("--hdr_significant_figures", type=int, choices=range(1, 6), default=3,
+                        help="decimal digits of precision kept by the latency histograms")
+
+
+class LatencyHistograms:
+
+    def __init__(self):
+        self.significant_figures = 3
+        self.entries: Dict[Tuple[str, str], HdrHistogram] = {}
+        self.total = HdrHistogram(self.significant_figures)
+
+    def configure(self, significant_figures: int):
+        self.significant_figures = significant_figures
+        self.entries = {}
+        self.total = HdrHistogram(significant_figures)
+
+    def get(self, request_type: str, name: str) -> HdrHistogram:
+        histogram = self.entries.get((request_type, name))
+        if histogram is None:
+            histogram = self.entries[(request_type, name)] = HdrHistogram(self.significant_figures)
+        return histogram
+
+    def on_request(self, request_type, name, response_time, **kwargs):
+        value = round(response_time * 1000)
+        self.get(request_type, name).record(value)
+        self.total.record(value)
+
+    def on_report_to_master(self, client_id, data, **kwargs):
+        # like locust's own stats every report carries the counts since the previous one
+        data[HISTOGRAMS_KEY] = {
+            "entries": [[request_type, name, histogram.to_sparse(), histogram.max_value]
+                        for (request_type, name), histogram in self.entries.items() if histogram.total_count],
+            "total": [self.total.to_sparse(), self.total.max_value],
+        }
+        for histogram in self.entries.values():
+            histogram.reset()
+        self.total.reset()
+
+    def on_worker_report(self, client_id, data, **kwargs):
+        if HISTOGRAMS_KEY not in data:
+            return
+        for request_type, name, sparse, max_value in data[HISTOGRAMS_KEY]["entries"]:
+            self.get(request_type, name).add_sparse(sparse, max_value)
+        self.total.add_sparse(*data[HISTOGRAMS_KEY]["total"])
+
+    def to_csv(self, writer):
+        writer.writerow(["Type", "Name", "Request Count"] + [f"{p}%" for p in HDR_PERCENTILES] + ["Max"])
+        rows = sorted(self.entries.items()) + [(("", TOTAL_NAME), self.total)]
+        for (request_type, name), histogram in rows:
+            writer.writerow([request_type, name, histogram.total_count]
+                            + [histogram.value_at_percentile(p) / 1000 for p in HDR_PERCENTILES]
+                            + [histogram.max_value / 1000])
+
+    def write_session_files(self, session_path):
+        with open(os.path.join(session_path, "csv_hdr_percentiles.csv"), "w") as f:
+            self.to_csv(csv.writer(f))
+
+        hgrm_path = os.path.join(session_path, HGRM_DIRNAME)
+        os.makedirs(hgrm_path, exist_ok=True)
+        rows = list(self.entries.items()) + [(("", TOTAL_NAME), self.total)]
+        for (request_type, name), histogram in rows:
+            file_name = re.sub(r"[^\w.-]+", "_", f"{request_type}_{name}".strip("_"))
+            with open(os.path.join(hgrm_path, f"{file_name}.hgrm"), "w") as f:
+                histogram.write_hgrm(f)
+
+
+latency_histograms = LatencyHistograms()
+
+
+def enable_latency_histograms(environment: Environment):
+    latency_histograms.configure(environment.parsed_options.hdr_significant_figures)
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(latency_histograms.on_worker_report)
+    else:
+        events.request.add_listener(latency_histograms.on_request)
+        events.report_to_master.add_listener(latency_histograms.on_report_to_master)
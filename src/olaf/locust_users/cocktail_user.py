@@ -0,0 +1,60 @@
+import importlib
+import sys
+
+from src.olaf.cocktail_endpoints import REST_KINDS, endpoint_user
+from src.olaf.custom_event_handler import register_event_handlers
+from src.olaf.params_cache import load_session_json
+
+register_event_handlers()
+
+
+def session_dir_from_argv(argv) -> str:
+    # locust imports the locustfile before it parses its options, so --session_dir is read off the command line
+    for ndx, arg in enumerate(argv):
+        if arg == "--session_dir" and ndx + 1 < len(argv):
+            return argv[ndx + 1]
+        if arg.startswith("--session_dir="):
+            return arg.split("=", 1)[1]
+    raise ValueError("cocktail users need the --session_dir of their session")
+
+
+def rest_endpoint_init(base_init):
+    def __init__(self, *args, **kwargs):
+        # the session's --host is only a label for a cocktail, every rest endpoint has its own url
+        self.host = self.endpoint_host
+        base_init(self, *args, **kwargs)
+
+    return __init__
+
+
+def compose_endpoint_user(endpoint_index: int, endpoint, mix):
+    kind = endpoint["kind"]
+    module_name, class_name = endpoint_user(endpoint)
+    # only the sdks of the endpoints in the cocktail are imported
+    base = getattr(importlib.import_module(module_name), class_name)
+    attributes = {
+        "__module__": __name__,
+        "endpoint_index": endpoint_index,
+        "weight": mix["weight"],
+        "fixed_count": mix["fixed_count"] or 0,
+        "target_rps": mix["target_rps"],
+    }
+    if kind in REST_KINDS:
+        attributes.update({
+            "endpoint_host": endpoint["url"],
+            "request_name": endpoint["url"],
+            "__init__": rest_endpoint_init(base.__init__),
+        })
+    return type(f"{class_name}_{endpoint_index}", (base,), attributes)
+
+
+def compose_cocktail_users(session_dir):
+    session_params = load_session_json(session_dir)
+    return [compose_endpoint_user(ndx, endpoint, mix)
+            for ndx, (endpoint, mix) in enumerate(zip(session_params["user_resources"],
+                                                      session_params["endpoint_mix"]))]
+
+
+# locust picks up the user classes found at module level
+globals().update({user_class.__name__: user_class
+                  for user_class in compose_cocktail_users(session_dir_from_argv(sys.argv))})
@@ -1,16 +1,16 @@
-import os
 import random
 import time
 
 from elasticsearch import Elasticsearch
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.client_registry import get_shared_client
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import ElasticsearchUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "elasticsearch_search"
 REQUEST_TYPE = "elasticsearch_query"
@@ -44,18 +44,26 @@ class ElasticsearchClient(Elasticsearch):
 
 class ElasticsearchUser(User):
     wait_time = constant(0)
+    endpoint_index = None
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(ElasticsearchUser, self).__init__(*args, **kwargs)
-        session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = ElasticsearchUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, ElasticsearchUserParams, self.endpoint_index)
 
-        self.client = ElasticsearchClient(self.params.url, http_auth=(self.params.access_key.get_secret_value(),
-                                                                      self.params.secret_key.get_secret_value()
-                                                                      ))
+        self.shared_client = get_shared_client(f"{self.params.kind}:{self.endpoint_index}:{self.params.url.host}:{self.params.index_name}",
+                                               self.create_client,
+                                               self.params.max_pool_connections)
         self.req = self.params.query_json
+        record_user_spawn(self, spawn_start_time)
+
+    def create_client(self):
+        return ElasticsearchClient(self.params.url, http_auth=(self.params.access_key.get_secret_value(),
+                                                               self.params.secret_key.get_secret_value()
+                                                               ),
+                                   connections_per_node=self.params.max_pool_connections)
 
     @task
     def sm(self):
-        self.client.query(index=self.params.index_name, body=random.choice(self.req))
+        with self.shared_client.lease() as client:
+            client.query(index=self.params.index_name, body=random.choice(self.req))
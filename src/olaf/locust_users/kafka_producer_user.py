@@ -1,34 +1,35 @@
-import os
-import random
 import time
 from typing import Dict
-import json
+from gevent.lock import BoundedSemaphore
 from kafka import KafkaProducer
 
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import KafkaProducerUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "kafka_producer"
 REQUEST_TYPE = "kafka_producer"
+ASYNC_REQUEST_TYPE = "kafka_producer_ack"
 
 
 class KafkaProducerImpl(KafkaProducer):
 
     def __init__(self, bootstrap_servers: str, sasl_username: str, sasl_password: str,
-                 kafka_config: Dict, kafka_producer_config: Dict):
-        config = kafka_config
+                 kafka_config: Dict, kafka_producer_config: Dict, max_in_flight: int = 1):
+        config = dict(kafka_config)
         config.update(kafka_producer_config)
         config["bootstrap_servers"] = bootstrap_servers
         config["sasl_plain_username"] = sasl_username
         config["sasl_plain_password"] = sasl_password
 
         super().__init__(**config)
+        self.in_flight = BoundedSemaphore(max_in_flight)
 
     def push_message(self, topic, message):
         start_time = time.perf_counter()
@@ -42,7 +43,7 @@ class KafkaProducerImpl(KafkaProducer):
         }
         try:
             self.send(topic=topic, key=None,
-                      value=json.dumps(message).encode('utf-8'),
+                      value=message,
                       )
             self.flush()
         except Exception as err:
@@ -52,29 +53,65 @@ class KafkaProducerImpl(KafkaProducer):
         events.request.fire(**request_meta)
         return request_meta["response"]
 
+    def push_message_async(self, topic, message):
+        # blocks the user once max_in_flight records are waiting for an ack, linger_ms and batch_size decide
+        # how the window is batched towards the broker
+        self.in_flight.acquire()
+        start_time = time.perf_counter()
+        try:
+            future = self.send(topic=topic, key=None,
+                               value=message,
+                               )
+        except Exception as err:
+            self._on_ack(start_time, len(message), None, exception=err)
+            return
+        future.add_callback(self._on_ack, start_time, len(message))
+        future.add_errback(self._on_error, start_time, len(message))
+
+    def _on_error(self, start_time, message_length, err):
+        self._on_ack(start_time, message_length, None, exception=err)
+
+    def _on_ack(self, start_time, message_length, record_metadata, exception=None):
+        self.in_flight.release()
+        events.request.fire(request_type=ASYNC_REQUEST_TYPE,
+                            name=NAME,
+                            response_time=(time.perf_counter() - start_time) * 1000,
+                            response_length=0 if exception else message_length,
+                            response=record_metadata,
+                            context={},
+                            exception=exception,
+                            )
+
 
 class KafkaProducerUser(User):
     wait_time = constant(0)
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(KafkaProducerUser, self).__init__(*args, **kwargs)
         session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = KafkaProducerUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, KafkaProducerUserParams)
 
         self.client = KafkaProducerImpl(bootstrap_servers=self.params.bootstrap_server,
                                         sasl_username=self.params.ssl_username.get_secret_value(),
                                         sasl_password=self.params.ssl_password.get_secret_value(),
                                         kafka_config=self.params.kafka_config,
                                         kafka_producer_config=self.params.kafka_producer_config,
+                                        max_in_flight=self.params.max_in_flight,
                                         )
-        self.req = self.params.query_json
+        if self.params.producer_mode == "async":
+            self.push_message = self.client.push_message_async
+        else:
+            self.push_message = self.client.push_message
+        self.corpus = load_payload_corpus(session_path)
         self.topic = self.params.topic_name
+        record_user_spawn(self, spawn_start_time)
 
     def on_stop(self):
+        # close flushes the records still in flight, their callbacks fire before it returns
         self.client.close(timeout=5)
 
     @task
     def sm(self):
-        self.client.push_message(topic=self.topic,
-                                 message=random.choice(self.req))
+        self.push_message(topic=self.topic,
+                          message=self.corpus.choice())
@@ -1,18 +1,17 @@
-import json
-import os
-import random
 import time
 
 import boto3
 import botocore.config
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.client_registry import get_shared_client
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import LambdaUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus, endpoint_dir
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "lambda"
 REQUEST_TYPE = "invoke_lambda"
@@ -20,30 +19,36 @@ REQUEST_TYPE = "invoke_lambda"
 
 class LambdaUser(User):
     wait_time = constant(0)
+    endpoint_index = None
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(LambdaUser, self).__init__(*args, **kwargs)
         session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = LambdaUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, LambdaUserParams, self.endpoint_index)
 
-        self.lambda_client = boto3.client('lambda',
-                                          region_name=self.params.aws_region,
-                                          aws_access_key_id=self.params.access_key.get_secret_value(),
-                                          aws_secret_access_key=self.params.secret_key.get_secret_value(),
-                                          aws_session_token=self.params.session_token.get_secret_value() if self.params.session_token.get_secret_value() else None,
-                                          config=botocore.config.Config(read_timeout=60,
-                                                                        max_pool_connections=100,
-                                                                        retries={
-                                                                            'max_attempts': 4},
-                                                                        ))
+        self.shared_client = get_shared_client(f"{self.params.kind}:{self.endpoint_index}:{self.params.lambda_arn}",
+                                               self.create_client,
+                                               self.params.max_pool_connections)
         self.lamba_arn = self.params.lambda_arn
-        self.req = self.params.query_json
+        self.corpus = load_payload_corpus(endpoint_dir(session_path, self.endpoint_index))
+        record_user_spawn(self, spawn_start_time)
+
+    def create_client(self):
+        return boto3.client('lambda',
+                            region_name=self.params.aws_region,
+                            aws_access_key_id=self.params.access_key.get_secret_value(),
+                            aws_secret_access_key=self.params.secret_key.get_secret_value(),
+                            aws_session_token=self.params.session_token.get_secret_value() if self.params.session_token.get_secret_value() else None,
+                            config=botocore.config.Config(read_timeout=60,
+                                                          max_pool_connections=self.params.max_pool_connections,
+                                                          retries={
+                                                              'max_attempts': 4},
+                                                          ))
 
     @task
     def sm(self):
-        req = random.choice(self.req)
-        start_time = time.perf_counter()
+        req = bytes(self.corpus.choice())
         request_meta = {
             "request_type": REQUEST_TYPE,
             "name": NAME,
@@ -53,15 +58,15 @@ class LambdaUser(User):
             "exception": None,
         }
 
-        try:
-            response = self.lambda_client.invoke(FunctionName=self.lamba_arn,
-                                                 Payload=json.dumps({
-                                                     "body": json.dumps(req)
-                                                 }))
-            assert response["StatusCode"] == 200
-        except Exception as err:
-            request_meta["exception"] = err
+        with self.shared_client.lease() as lambda_client:
+            start_time = time.perf_counter()
+            try:
+                response = lambda_client.invoke(FunctionName=self.lamba_arn,
+                                                Payload=req)
+                assert response["StatusCode"] == 200
+            except Exception as err:
+                request_meta["exception"] = err
 
-        request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+            request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
         events.request.fire(**request_meta)
         return request_meta["response"]
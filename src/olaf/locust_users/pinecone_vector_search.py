@@ -1,24 +1,56 @@
-import os
 import random
 import time
-from typing import Dict
-import json
-import numpy as np
-from ast import literal_eval
+from functools import lru_cache
+from typing import Dict, List
 
+import numpy as np
 import pinecone
+from gevent import monkey
+from gevent.pool import Pool
 
 from locust import User, events, task, constant
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import PineConeVectorSearchUserParams
+from src.olaf.params_cache import load_user_params, load_session_params
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
+
+# the in flight queries are greenlets, they only overlap when the client's urllib3 sockets and ssl are gevent's.
+# locust patches them on import, before it loads this locustfile
+if not (monkey.is_module_patched("socket") and monkey.is_module_patched("ssl")):
+    raise RuntimeError("pinecone queries need gevent patched sockets, run this user through locust")
 
 NAME = 'pinecone_vector_search'
 REQUEST_TYPE = 'pinecone_vector_search'
 
+
+class PreloadedQueries:
+
+    def __init__(self, query_json: List[Dict]):
+        # every query is built once, dense vectors validated as float32 and kept as the plain lists the client sends
+        self.queries = []
+        for message in query_json:
+            query = {"top_k": message['top_k'],
+                     "include_metadata": message['include_metadata'],
+                     "namespace": message.get('namespace', None)}
+            if message.get('query_vectors', None) is not None:
+                query["queries"] = message['query_vectors']
+            else:
+                query["sparse_vector"] = message.get('sparse_vector', None)
+                if message.get('vector', None) is not None:
+                    query["vector"] = np.asarray(message['vector'], dtype=np.float32).tolist()
+            self.queries.append(query)
+
+    def choice(self) -> Dict:
+        return random.choice(self.queries)
+
+
+@lru_cache(maxsize=None)
+def load_preloaded_queries(session_dir) -> PreloadedQueries:
+    return PreloadedQueries(load_session_params(PineConeVectorSearchUserParams, session_dir).query_json)
+
+
 class PineConeVectorSearch:
 
     def __init__(self, api_key: str, environment_name: str, index_name: str):
@@ -31,7 +63,7 @@ class PineConeVectorSearch:
     def close(self):
         pass
 
-    def vector_search(self, message):
+    def vector_search(self, query):
         start_time = time.perf_counter()
         request_meta = {
             "request_type": REQUEST_TYPE,
@@ -42,19 +74,8 @@ class PineConeVectorSearch:
             "exception": None,
         }
         try:
-            top_k = message['top_k']
-            include_metadata = message['include_metadata']
-            query_vectors = message.get('query_vectors', None)
-            namespace = message.get('namespace', None)
-            if query_vectors is not None:
-                # Execute the query
-                self.index.query(queries=query_vectors, top_k=top_k,
-                                 include_metadata=include_metadata, namespace=namespace)
-            else:
-                dense = message.get('vector', None)
-                sparse = message.get('sparse_vector', None)
-                self.index.query(top_k=top_k, include_metadata=include_metadata,
-                                 vector=dense, sparse_vector=sparse, namespace=namespace)
+            # Execute the query
+            self.index.query(**query)
         except Exception as err:
             request_meta["exception"] = err
 
@@ -62,22 +83,25 @@ class PineConeVectorSearch:
         events.request.fire(**request_meta)
         return request_meta["response"]
 
+
 class PineConeVectorSearchUser(User):
     wait_time = constant(0)
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(PineConeVectorSearchUser, self).__init__(*args, **kwargs)
-        session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = PineConeVectorSearchUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, PineConeVectorSearchUserParams)
         self.client = PineConeVectorSearch(api_key=self.params.api_key,
                                            environment_name=self.params.environment_name,
                                            index_name=self.params.index_name)
-        self.req = self.params.query_json
+        self.queries = load_preloaded_queries(self.environment.parsed_options.session_dir)
+        # each query runs in its own greenlet, spawn blocks once max_in_flight of them are waiting on pinecone
+        self.in_flight = Pool(self.params.max_in_flight)
+        record_user_spawn(self, spawn_start_time)
 
     def on_stop(self):
-        pass
+        self.in_flight.join(timeout=5)
 
     @task
     def sm(self):
-        self.client.vector_search(message=random.choice(self.req))
+        self.in_flight.spawn(self.client.vector_search, self.queries.choice())
@@ -1,21 +1,21 @@
-import os
 import random
 import time
-from typing import Dict
-import json
 from redis import StrictRedis, Sentinel, RedisCluster
 
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.batch_events import count_batch_entries
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import RedisStreamUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "redis_stream_producer"
 REQUEST_TYPE = "redis_stream_producer"
+PIPELINE_REQUEST_TYPE = "redis_stream_pipeline"
+PIPELINE_ENTRY_REQUEST_TYPE = "redis_stream_entry"
 
 
 class RedisStreamProducer:
@@ -33,7 +33,7 @@ class RedisStreamProducer:
     def close(self):
         self.redis_client.close()
 
-    def push_message(self, stream_name, message):
+    def push_message(self, stream_name, message, maxlen=None):
         start_time = time.perf_counter()
         request_meta = {
             "request_type": REQUEST_TYPE,
@@ -45,7 +45,9 @@ class RedisStreamProducer:
         }
         try:
             self.redis_client.xadd(name=stream_name,
-                                   fields=message
+                                   fields=message,
+                                   maxlen=maxlen,
+                                   approximate=True,
                                    )
         except Exception as err:
             request_meta["exception"] = err
@@ -54,30 +56,67 @@ class RedisStreamProducer:
         events.request.fire(**request_meta)
         return request_meta["response"]
 
+    def push_messages(self, stream_name, messages, maxlen=None):
+        start_time = time.perf_counter()
+        request_meta = {
+            "request_type": PIPELINE_REQUEST_TYPE,
+            "name": NAME,
+            "response_length": 0,
+            "response": None,
+            "context": {},
+            "exception": None,
+        }
+        results = []
+        try:
+            # cluster pipelines do not support transactions, all entries of a stream hash to the same slot anyway
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for message in messages:
+                pipeline.xadd(name=stream_name,
+                              fields=message,
+                              maxlen=maxlen,
+                              approximate=True,
+                              )
+            results = pipeline.execute(raise_on_error=False)
+            request_meta["response"] = results
+        except Exception as err:
+            request_meta["exception"] = err
+
+        request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+        events.request.fire(**request_meta)
+
+        count_batch_entries(request_meta, PIPELINE_ENTRY_REQUEST_TYPE, len(messages),
+                            sum(isinstance(result, Exception) for result in results))
+        return request_meta["response"]
+
 
 class RedisStreamProducerUser(User):
     wait_time = constant(0)
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(RedisStreamProducerUser, self).__init__(*args, **kwargs)
-        session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = RedisStreamUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, RedisStreamUserParams)
 
         self.client = RedisStreamProducer(redis_type=self.params.redis_type,
                                           host=self.params.host,
                                           port=self.params.port,
                                           username=self.params.username.get_secret_value(),
                                           password=self.params.password.get_secret_value(),
-
-                                        )
+                                          )
         self.req = self.params.query_json
         self.topic = self.params.stream_name
+        record_user_spawn(self, spawn_start_time)
 
     def on_stop(self):
         self.client.close()
 
     @task
     def sm(self):
-        self.client.push_message(stream_name=self.topic,
-                                 message=random.choice(self.req))
+        if self.params.pipeline_depth > 1:
+            self.client.push_messages(stream_name=self.topic,
+                                      messages=random.choices(self.req, k=self.params.pipeline_depth),
+                                      maxlen=self.params.maxlen)
+        else:
+            self.client.push_message(stream_name=self.topic,
+                                     message=random.choice(self.req),
+                                     maxlen=self.params.maxlen)
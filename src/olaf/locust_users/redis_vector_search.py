@@ -1,26 +1,62 @@
-import os
 import random
 import time
-from typing import Dict
-import json
-import numpy as np
 from ast import literal_eval
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
 from redis import Redis
 from redis.commands.search.query import Query
 
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import RedisVectorSearchUserParams
+from src.olaf.params_cache import load_user_params, load_session_params
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "redis_vector_search"
 REQUEST_TYPE = "redis_vector_search"
 
 
+def _parse(value):
+    return literal_eval(value) if isinstance(value, str) else value
+
+
+class CompiledVectorQueries:
+
+    def __init__(self, query_json: List[Dict]):
+        # all embeddings end up as rows of one float32 matrix, each request sends its row's buffer as is
+        self.embeddings = np.ascontiguousarray([_parse(message['embedding']) for message in query_json],
+                                               dtype=np.float32)
+        self._query_cache: Dict[tuple, Query] = {}
+        self.queries = [self.get_query(message['topK'], message['field_name'],
+                                       tuple(_parse(message['return_fields'])))
+                        for message in query_json]
+
+    def __len__(self):
+        return len(self.queries)
+
+    def get_query(self, top_k, field_name, return_fields) -> Query:
+        key = (top_k, field_name, return_fields)
+        if key not in self._query_cache:
+            self._query_cache[key] = Query(f'*=>[KNN {top_k} @{field_name} $vec_param AS vector_score]').sort_by(
+                'vector_score').paging(0, top_k).return_fields(*return_fields).dialect(2)
+        return self._query_cache[key]
+
+    def choice(self):
+        ndx = random.randrange(len(self.queries))
+        # byte view of the row, redis-py sends it without copying
+        return self.queries[ndx], self.embeddings[ndx].data.cast("B")
+
+
+@lru_cache(maxsize=None)
+def load_compiled_vector_queries(session_dir) -> CompiledVectorQueries:
+    return CompiledVectorQueries(load_session_params(RedisVectorSearchUserParams, session_dir).query_json)
+
+
 class RedisVectorSearch:
 
     def __init__(self, host: str, port: int, password: str, index_name: str):
@@ -33,7 +69,7 @@ class RedisVectorSearch:
     def close(self):
         self.redis_client.close()
 
-    def vector_search(self, message):
+    def vector_search(self, query, query_vector):
         start_time = time.perf_counter()
         request_meta = {
             "request_type": REQUEST_TYPE,
@@ -44,16 +80,10 @@ class RedisVectorSearch:
             "exception": None,
         }
         try:
-            topK = message['topK']
-            ITEM_KEYWORD_EMBEDDING_FIELD = message['field_name']
-            RETURN_FIELDS = literal_eval(message['return_fields'])
-            q = Query(f'*=>[KNN {topK} @{ITEM_KEYWORD_EMBEDDING_FIELD} $vec_param AS vector_score]').sort_by(
-                'vector_score').paging(0, topK).return_fields(*RETURN_FIELDS).dialect(2)
-            query_vector = np.array(literal_eval(message['embedding'])).astype(np.float32).tobytes()
             params_dict = {"vec_param": query_vector}
 
             # Execute the query
-            self.redis_client.ft(self.index_name).search(q, query_params=params_dict)
+            self.redis_client.ft(self.index_name).search(query, query_params=params_dict)
         except Exception as err:
             request_meta["exception"] = err
 
@@ -66,20 +96,21 @@ class RedisVectorSearchUser(User):
     wait_time = constant(0)
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(RedisVectorSearchUser, self).__init__(*args, **kwargs)
-        session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = RedisVectorSearchUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, RedisVectorSearchUserParams)
 
         self.client = RedisVectorSearch(host=self.params.host,
                                         port=self.params.port,
                                         password=self.params.password,
                                         index_name=self.params.index_name)
-        self.req = self.params.query_json
+        self.queries = load_compiled_vector_queries(self.environment.parsed_options.session_dir)
+        record_user_spawn(self, spawn_start_time)
 
     def on_stop(self):
         self.client.close()
 
     @task
     def sm(self):
-        self.client.vector_search(message=random.choice(self.req))
+        query, query_vector = self.queries.choice()
+        self.client.vector_search(query=query, query_vector=query_vector)
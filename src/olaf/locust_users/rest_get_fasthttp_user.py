@@ -0,0 +1,27 @@
+import time
+
+from locust import FastHttpUser, task, constant
+
+from src.olaf.custom_event_handler import register_event_handlers
+from src.olaf.datamodel import RestGetUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.spawn_stats import record_user_spawn
+
+register_event_handlers()
+
+
+class RestGetFastHttpUser(FastHttpUser):
+    wait_time = constant(0)
+    endpoint_index = None
+    request_name = None
+
+    def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
+        super(RestGetFastHttpUser, self).__init__(*args, **kwargs)
+        self.params = load_user_params(self.environment, RestGetUserParams, self.endpoint_index)
+        self.headers = dict(self.params.header_json)
+        record_user_spawn(self, spawn_start_time)
+
+    @task
+    def get_task(self):
+        self.client.get("", headers=self.headers, name=self.request_name)
@@ -0,0 +1,35 @@
+import time
+
+from locust import FastHttpUser, task, constant
+
+from src.olaf.custom_event_handler import register_event_handlers
+from src.olaf.datamodel import RestPostUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus, endpoint_dir
+from src.olaf.spawn_stats import record_user_spawn
+
+register_event_handlers()
+
+
+class RestPostFastHttpUser(FastHttpUser):
+    wait_time = constant(0)
+    endpoint_index = None
+    request_name = None
+
+    def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
+        super(RestPostFastHttpUser, self).__init__(*args, **kwargs)
+        session_path = self.environment.parsed_options.session_dir
+        self.params = load_user_params(self.environment, RestPostUserParams, self.endpoint_index)
+
+        self.headers = {"Content-Type": "application/json", **self.params.header_json}
+        self.corpus = load_payload_corpus(endpoint_dir(session_path, self.endpoint_index))
+        record_user_spawn(self, spawn_start_time)
+
+    @task
+    def post_task(self):
+        self.client.post("",
+                         headers=self.headers,
+                         data=bytes(self.corpus.choice()),
+                         name=self.request_name,
+                         )
@@ -1,31 +1,35 @@
-import os
-import random
+import time
 
-from locust import HttpUser, task, events, constant
+from locust import HttpUser, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import RestPostUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus, endpoint_dir
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 
 class RestPostUser(HttpUser):
     wait_time = constant(0)
+    endpoint_index = None
+    request_name = None
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(RestPostUser, self).__init__(*args, **kwargs)
-
         session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = RestPostUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, RestPostUserParams, self.endpoint_index)
 
-        self.req = self.params.query_json
+        self.headers = {"Content-Type": "application/json", **self.params.header_json}
+        self.corpus = load_payload_corpus(endpoint_dir(session_path, self.endpoint_index))
+        record_user_spawn(self, spawn_start_time)
 
     @task
     def post_task(self):
         self.client.post("",
-                         headers=self.params.header_json,
-                         json=random.choice(self.req),
+                         headers=self.headers,
+                         data=bytes(self.corpus.choice()),
+                         name=self.request_name,
                          )
@@ -1,4 +1,3 @@
-import os
 import random
 import time
 
@@ -12,12 +11,13 @@ from sagemaker.sklearn.model import SKLearnPredictor
 from sagemaker.tensorflow import TensorFlowPredictor
 
 from boto3 import Session
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.client_registry import get_shared_client
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import SagemakerUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 
 class SagemakerTensorFlowClient(TensorFlowPredictor):
@@ -124,6 +124,7 @@ class SagemakerSKLearnClient(SKLearnPredictor):
 
 class SagemakerUser(User):
     wait_time = constant(0)
+    endpoint_index = None
     predictor_class_mapping = {
         "pytorch predictor": SagemakerPyTorchClient,
         "sklearn predictor": SagemakerSKLearnClient,
@@ -131,11 +132,17 @@ class SagemakerUser(User):
     }
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(SagemakerUser, self).__init__(*args, **kwargs)
-        session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = SagemakerUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, SagemakerUserParams, self.endpoint_index)
 
+        self.shared_client = get_shared_client(f"{self.params.kind}:{self.endpoint_index}:{self.params.endpoint}",
+                                               self.create_client,
+                                               self.params.max_pool_connections)
+        self.req = self.params.query_json
+        record_user_spawn(self, spawn_start_time)
+
+    def create_client(self):
         if self.params.input_serializer == "numpy":
             serializer = NumpySerializer()
         elif self.params.input_serializer == "json":
@@ -157,7 +164,7 @@ class SagemakerUser(User):
                                )
         sm_runtime_client = boto_session.client("runtime.sagemaker",
                                                 config=botocore.config.Config(read_timeout=60,
-                                                                              max_pool_connections=100,
+                                                                              max_pool_connections=self.params.max_pool_connections,
                                                                               retries={
                                                                                   'max_attempts': 4},
                                                                               ))
@@ -165,17 +172,17 @@ class SagemakerUser(User):
                                        sagemaker_runtime_client=sm_runtime_client
                                        )
 
-        self.client = self.predictor_class_mapping[self.params.predictor_type](
+        return self.predictor_class_mapping[self.params.predictor_type](
             sagemaker_session=sm_session,
             endpoint_name=self.params.endpoint,
             serializer=serializer,
             deserializer=deserializer,
         )
-        self.req = self.params.query_json
 
     @task
     def sm(self):
-        if self.params.batch_mode:
-            self.client.predictEx(random.choices(self.req, k=self.params.batch_value), mme=self.params.multi_model)
-        else:
-            self.client.predictEx(random.choice(self.req), mme=self.params.multi_model)
+        with self.shared_client.lease() as client:
+            if self.params.batch_mode:
+                client.predictEx(random.choices(self.req, k=self.params.batch_value), mme=self.params.multi_model)
+            else:
+                client.predictEx(random.choice(self.req), mme=self.params.multi_model)
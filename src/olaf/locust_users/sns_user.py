@@ -1,51 +1,65 @@
-import json
-import os
-import random
 import time
 
 import boto3
 import botocore.config
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.batch_events import get_failed_entries, count_batch_entries
+from src.olaf.client_registry import get_shared_client
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import SNSUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus, endpoint_dir
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "sns"
 REQUEST_TYPE = "sns_publish_message"
+BATCH_REQUEST_TYPE = "sns_publish_batch"
+BATCH_ENTRY_REQUEST_TYPE = "sns_batch_message"
 
 
 class SNSUser(User):
     wait_time = constant(0)
+    endpoint_index = None
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(SNSUser, self).__init__(*args, **kwargs)
         session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = SNSUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, SNSUserParams, self.endpoint_index)
 
+        self.shared_client = get_shared_client(f"{self.params.kind}:{self.endpoint_index}:{self.params.sns_arn}",
+                                               self.create_client,
+                                               self.params.max_pool_connections)
+
+        self.corpus = load_payload_corpus(endpoint_dir(session_path, self.endpoint_index))
+        self.message_attributes = self.params.message_attribute_json
+        record_user_spawn(self, spawn_start_time)
+
+    def create_client(self):
         sns = boto3.resource('sns',
                              region_name=self.params.aws_region,
                              aws_access_key_id=self.params.access_key.get_secret_value(),
                              aws_secret_access_key=self.params.secret_key.get_secret_value(),
                              aws_session_token=self.params.session_token.get_secret_value() if self.params.session_token.get_secret_value() else None,
                              config=botocore.config.Config(read_timeout=60,
-                                                           max_pool_connections=100,
+                                                           max_pool_connections=self.params.max_pool_connections,
                                                            retries={
                                                                'max_attempts': 4},
                                                            ))
-        self.sns_topic = sns.Topic(arn=self.params.sns_arn)
-
-        self.req = self.params.query_json
-        self.message_attributes = self.params.message_attribute_json
+        return sns.Topic(arn=self.params.sns_arn)
 
     @task
     def sm(self):
-        req = random.choice(self.req)
-        start_time = time.perf_counter()
+        if self.params.batch_mode:
+            self.publish_batch()
+        else:
+            self.publish()
+
+    def publish(self):
+        req = str(self.corpus.choice(), "utf-8")
         request_meta = {
             "request_type": REQUEST_TYPE,
             "name": NAME,
@@ -54,13 +68,45 @@ class SNSUser(User):
             "context": {},
             "exception": None,
         }
-        try:
-            response = self.sns_topic.publish(Message=json.dumps(req),
-                                              MessageAttributes=self.message_attributes,
-                                              )
-        except Exception as err:
-            request_meta["exception"] = err
-
-        request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+
+        with self.shared_client.lease() as sns_topic:
+            start_time = time.perf_counter()
+            try:
+                response = sns_topic.publish(Message=req,
+                                             MessageAttributes=self.message_attributes,
+                                             )
+            except Exception as err:
+                request_meta["exception"] = err
+
+            request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+        events.request.fire(**request_meta)
+        return request_meta["response"]
+
+    def publish_batch(self):
+        entries = [{"Id": str(ndx),
+                    "Message": str(message, "utf-8"),
+                    "MessageAttributes": self.message_attributes,
+                    } for ndx, message in enumerate(self.corpus.choices(self.params.batch_value))]
+        request_meta = {
+            "request_type": BATCH_REQUEST_TYPE,
+            "name": NAME,
+            "response_length": 0,
+            "response": None,
+            "context": {},
+            "exception": None,
+        }
+        failed = {}
+
+        with self.shared_client.lease() as sns_topic:
+            start_time = time.perf_counter()
+            try:
+                request_meta["response"] = sns_topic.meta.client.publish_batch(TopicArn=sns_topic.arn,
+                                                                               PublishBatchRequestEntries=entries)
+                failed = get_failed_entries(request_meta["response"], self.params.partial_failure_accounting)
+            except Exception as err:
+                request_meta["exception"] = err
+
+            request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
         events.request.fire(**request_meta)
+        count_batch_entries(request_meta, BATCH_ENTRY_REQUEST_TYPE, len(entries), len(failed))
         return request_meta["response"]
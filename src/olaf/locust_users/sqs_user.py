@@ -1,52 +1,65 @@
-import json
-import os
-import random
 import time
 
 import boto3
 import botocore.config
 from locust import User, events, task, constant
 
-from src.constants import PARAMS_JSON_FILENAME
-from src.olaf.custom_event_handler import add_session_dir_arg, on_test_quit
+from src.olaf.batch_events import get_failed_entries, count_batch_entries
+from src.olaf.client_registry import get_shared_client
+from src.olaf.custom_event_handler import register_event_handlers
 from src.olaf.datamodel import SQSUserParams
+from src.olaf.params_cache import load_user_params
+from src.olaf.payload_corpus import load_payload_corpus, endpoint_dir
+from src.olaf.spawn_stats import record_user_spawn
 
-events.init_command_line_parser.add_listener(add_session_dir_arg)
-events.quitting.add_listener(on_test_quit)
+register_event_handlers()
 
 NAME = "sqs"
 REQUEST_TYPE = "sqs_send_message"
+BATCH_REQUEST_TYPE = "sqs_send_message_batch"
+BATCH_ENTRY_REQUEST_TYPE = "sqs_batch_message"
 
 
 class SQSUser(User):
     wait_time = constant(0)
+    endpoint_index = None
 
     def __init__(self, *args, **kwargs):
+        spawn_start_time = time.perf_counter()
         super(SQSUser, self).__init__(*args, **kwargs)
         session_path = self.environment.parsed_options.session_dir
-        with open(os.path.join(session_path, PARAMS_JSON_FILENAME)) as f:
-            self.params = SQSUserParams.parse_raw(f.read())
+        self.params = load_user_params(self.environment, SQSUserParams, self.endpoint_index)
 
+        self.shared_client = get_shared_client(f"{self.params.kind}:{self.endpoint_index}:{self.params.sqs_name}",
+                                               self.create_client,
+                                               self.params.max_pool_connections)
+
+        self.corpus = load_payload_corpus(endpoint_dir(session_path, self.endpoint_index))
+        self.message_attributes = self.params.message_attribute_json
+        record_user_spawn(self, spawn_start_time)
+
+    def create_client(self):
         sqs = boto3.resource('sqs',
                              region_name=self.params.aws_region,
                              aws_access_key_id=self.params.access_key.get_secret_value(),
                              aws_secret_access_key=self.params.secret_key.get_secret_value(),
                              aws_session_token=self.params.session_token.get_secret_value() if self.params.session_token.get_secret_value() else None,
                              config=botocore.config.Config(read_timeout=60,
-                                                           max_pool_connections=100,
+                                                           max_pool_connections=self.params.max_pool_connections,
                                                            retries={
                                                                'max_attempts': 4},
                                                            ))
-
-        self.queue = sqs.get_queue_by_name(QueueName=self.params.sqs_name)
-
-        self.req = self.params.query_json
-        self.message_attributes = self.params.message_attribute_json
+        return sqs.get_queue_by_name(QueueName=self.params.sqs_name)
 
     @task
     def sm(self):
-        req = random.choice(self.req)
-        start_time = time.perf_counter()
+        if self.params.batch_mode:
+            self.send_message_batch()
+        else:
+            self.send_message()
+
+    def send_message(self):
+        req = str(self.corpus.choice(), "utf-8")
         request_meta = {
             "request_type": REQUEST_TYPE,
             "name": NAME,
@@ -56,13 +69,43 @@ class SQSUser(User):
             "exception": None,
         }
 
-        try:
-            response = self.queue.send_message(MessageBody=json.dumps(req),
-                                               MessageAttributes=self.message_attributes
-                                               )
-        except Exception as err:
-            request_meta["exception"] = err
+        with self.shared_client.lease() as queue:
+            start_time = time.perf_counter()
+            try:
+                response = queue.send_message(MessageBody=req,
+                                              MessageAttributes=self.message_attributes
+                                              )
+            except Exception as err:
+                request_meta["exception"] = err
+
+            request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+        events.request.fire(**request_meta)
+        return request_meta["response"]
+
+    def send_message_batch(self):
+        entries = [{"Id": str(ndx),
+                    "MessageBody": str(message, "utf-8"),
+                    "MessageAttributes": self.message_attributes,
+                    } for ndx, message in enumerate(self.corpus.choices(self.params.batch_value))]
+        request_meta = {
+            "request_type": BATCH_REQUEST_TYPE,
+            "name": NAME,
+            "response_length": 0,
+            "response": None,
+            "context": {},
+            "exception": None,
+        }
+        failed = {}
+
+        with self.shared_client.lease() as queue:
+            start_time = time.perf_counter()
+            try:
+                request_meta["response"] = queue.send_messages(Entries=entries)
+                failed = get_failed_entries(request_meta["response"], self.params.partial_failure_accounting)
+            except Exception as err:
+                request_meta["exception"] = err
 
-        request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
+            request_meta["response_time"] = (time.perf_counter() - start_time) * 1000
         events.request.fire(**request_meta)
+        count_batch_entries(request_meta, BATCH_ENTRY_REQUEST_TYPE, len(entries), len(failed))
         return request_meta["response"]
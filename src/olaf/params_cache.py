@@ -0,0 +1,31 @@
+import json
+import os
+from functools import lru_cache
+
+from src.constants import PARAMS_JSON_FILENAME
+
+
+@lru_cache(maxsize=None)
+def load_session_params(params_class, session_dir):
+    with open(os.path.join(session_dir, PARAMS_JSON_FILENAME)) as f:
+        return params_class.parse_raw(f.read())
+
+
+@lru_cache(maxsize=None)
+def load_session_json(session_dir):
+    with open(os.path.join(session_dir, PARAMS_JSON_FILENAME)) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_endpoint_params(params_class, session_dir, endpoint_index):
+    # only the endpoint's own entry is parsed (and its secrets decrypted), not every endpoint of the cocktail
+    return params_class.parse_obj(load_session_json(session_dir)["user_resources"][endpoint_index])
+
+
+def load_user_params(environment, params_class, endpoint_index=None):
+    # parsed and decrypted once per worker process, every spawned user shares the same params object
+    session_dir = environment.parsed_options.session_dir
+    if endpoint_index is None:
+        return load_session_params(params_class, session_dir)
+    return load_endpoint_params(params_class, session_dir, endpoint_index)
@@ -0,0 +1,75 @@
+import json
+import mmap
+import os
+import random
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List
+
+from src.constants import PAYLOAD_CORPUS_FILENAME, PAYLOAD_INDEX_FILENAME
+
+# offsets are stored as native unsigned 64 bit integers, n payloads -> n + 1 offsets
+OFFSET_TYPECODE = "Q"
+
+
+def encode_json(payload) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+
+def encode_lambda_event(payload) -> bytes:
+    return json.dumps({"body": json.dumps(payload)}).encode("utf-8")
+
+
+def compile_payload_corpus(query_json: List, session_dir: Path,
+                           encoder: Callable[[object], bytes] = encode_json):
+    offsets = array(OFFSET_TYPECODE, [0])
+    with open(os.path.join(session_dir, PAYLOAD_CORPUS_FILENAME), "wb") as f:
+        for payload in query_json:
+            offsets.append(offsets[-1] + f.write(encoder(payload)))
+
+    with open(os.path.join(session_dir, PAYLOAD_INDEX_FILENAME), "wb") as f:
+        offsets.tofile(f)
+
+
+def _mmap_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PayloadCorpus:
+
+    def __init__(self, session_dir):
+        self._data = _mmap_file(os.path.join(session_dir, PAYLOAD_CORPUS_FILENAME))
+        self._index = _mmap_file(os.path.join(session_dir, PAYLOAD_INDEX_FILENAME))
+        self._view = memoryview(self._data)
+        self._offsets = memoryview(self._index).cast(OFFSET_TYPECODE)
+        self._size = len(self._offsets) - 1
+        if self._size < 1:
+            raise ValueError(f"payload corpus at {session_dir} is empty")
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, ndx) -> memoryview:
+        return self._view[self._offsets[ndx]:self._offsets[ndx + 1]]
+
+    def choice(self) -> memoryview:
+        return self[random.randrange(self._size)]
+
+    def choices(self, k):
+        return [self.choice() for _ in range(k)]
+
+
+def endpoint_dir(session_dir, endpoint_index=None) -> str:
+    # every endpoint of a cocktail keeps its corpus in a directory of its own
+    if endpoint_index is None:
+        return str(session_dir)
+    return os.path.join(session_dir, f"endpoint_{endpoint_index}")
+
+
+@lru_cache(maxsize=None)
+def load_payload_corpus(session_dir) -> PayloadCorpus:
+    return PayloadCorpus(session_dir)
@@ -0,0 +1,137 @@
+import json
+import os
+import struct
+import time
+from array import array
+from typing import Dict, Tuple
+
+import gevent
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner, WorkerRunner
+
+from src.constants import RAW_TIMINGS_DIRNAME, RAW_TIMINGS_DONE_SUFFIX
+
+RAW_TIMINGS_MAGIC = b"OLAFRAW1"
+BLOCK_HEADER = struct.Struct("<I")
+# column name, array typecode: unix timestamp of the response, latency in ms, response bytes, name id, failed
+COLUMNS = [("timestamp", "d"), ("response_time", "f"), ("response_length", "Q"), ("name_id", "I"), ("error", "B")]
+FLUSH_INTERVAL = 0.5
+
+
+def add_raw_timing_args(parser):
+    parser.add_argument("--raw_timing_log", action="store_true", default=False,
+                        help="write every request to a columnar log in the session directory")
+    parser.add_argument("--raw_timing_capacity", type=int, default=1 << 18,
+                        help="rows buffered per worker between flushes, rounded up to a power of two")
+
+
+class RawTimingLog:
+    """
+    Per worker ring buffer of request timings. The request listener only stores into preallocated columns, a
+    background greenlet copies the filled part out and hands the file write to the hub's threadpool.
+
+    The file is a sequence of blocks after an 8 byte magic: a uint32 row count followed by every column of
+    COLUMNS as a packed native array. Request names are kept in a json sidecar, keyed by name id.
+    """
+
+    def __init__(self, path: str, worker_id: str, capacity: int):
+        self.path = path
+        self.worker_id = worker_id
+        self.capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.mask = self.capacity - 1
+        self.columns = {name: array(typecode, bytes(array(typecode).itemsize * self.capacity))
+                        for name, typecode in COLUMNS}
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        self.name_ids: Dict[Tuple[str, str], int] = {}
+        self._names_written = 0
+        self._closing = False
+        self._file = open(path, "wb")
+        self._file.write(RAW_TIMINGS_MAGIC)
+        self._flusher = gevent.spawn(self._flush_loop)
+
+    def on_request(self, request_type, name, response_time, response_length, exception=None, **kwargs):
+        if self.head - self.tail == self.capacity:
+            self.dropped += 1
+            return
+        name_id = self.name_ids.get((request_type, name))
+        if name_id is None:
+            name_id = self.name_ids[(request_type, name)] = len(self.name_ids)
+        ndx = self.head & self.mask
+        columns = self.columns
+        columns["timestamp"][ndx] = time.time()
+        columns["response_time"][ndx] = response_time
+        columns["response_length"][ndx] = response_length or 0
+        columns["name_id"][ndx] = name_id
+        columns["error"][ndx] = exception is not None
+        self.head += 1
+
+    def _flush_loop(self):
+        while not self._closing:
+            gevent.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        rows = self.head - self.tail
+        if not rows:
+            return
+        start = self.tail & self.mask
+        end = start + rows
+        block = [BLOCK_HEADER.pack(rows)]
+        for name, _ in COLUMNS:
+            column = self.columns[name]
+            if end <= self.capacity:
+                block.append(column[start:end].tobytes())
+            else:
+                block.append(column[start:].tobytes() + column[:end - self.capacity].tobytes())
+        self.tail += rows
+        gevent.get_hub().threadpool.apply(self._file.write, (b"".join(block),))
+
+        if self._names_written != len(self.name_ids):
+            self._names_written = len(self.name_ids)
+            self.write_names()
+
+    def write_names(self):
+        with open(f"{self.path}.names.json", "w") as f:
+            json.dump({"worker_id": self.worker_id,
+                       "dropped": self.dropped,
+                       "names": {name_id: list(key) for key, name_id in self.name_ids.items()}}, f)
+
+    def close(self):
+        # joined instead of killed, so a write still running in the threadpool is never cut off
+        self._closing = True
+        self._flusher.join()
+        self.flush()
+        self.write_names()
+        self._file.close()
+        # the uploader waits for this marker, the log and its names are complete once it exists
+        with open(f"{self.path}{RAW_TIMINGS_DONE_SUFFIX}", "w") as f:
+            json.dump({"worker_id": self.worker_id, "rows": self.head, "dropped": self.dropped}, f)
+
+
+def read_raw_timing_log(path: str) -> Dict[str, array]:
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    with open(path, "rb") as f:
+        assert f.read(len(RAW_TIMINGS_MAGIC)) == RAW_TIMINGS_MAGIC, f"{path} is not a raw timing log"
+        while header := f.read(BLOCK_HEADER.size):
+            rows, = BLOCK_HEADER.unpack(header)
+            for name, typecode in COLUMNS:
+                columns[name].fromfile(f, rows)
+    return columns
+
+
+def enable_raw_timing_log(environment: Environment):
+    options = environment.parsed_options
+    if not options.raw_timing_log or isinstance(environment.runner, MasterRunner):
+        return
+    worker_id = environment.runner.client_id if isinstance(environment.runner, WorkerRunner) else "local"
+    log_path = os.path.join(options.session_dir, RAW_TIMINGS_DIRNAME)
+    os.makedirs(log_path, exist_ok=True)
+    raw_timing_log = RawTimingLog(os.path.join(log_path, f"{worker_id}.bin"), worker_id,
+                                  options.raw_timing_capacity)
+    events.request.add_listener(raw_timing_log.on_request)
+    # the master uploads the session dir while quitting, so the buffer is flushed as soon as the test stops
+    events.test_stop.add_listener(lambda **kwargs: raw_timing_log.flush())
+    events.quitting.add_listener(lambda **kwargs: raw_timing_log.close())
@@ -0,0 +1,94 @@
+import logging
+import time
+import urllib.error
+import urllib.request
+from subprocess import Popen
+from typing import Optional
+
+from pydantic import BaseSettings, Extra
+
+from src.constants import SESSION_CREATION_PATH, RAW_TIMINGS_DIRNAME
+from src.olaf.s3_uploader import start_session_upload
+from src.olaf.worker_sizing import plan_workers, pin_to
+from src.olaf.worker_forkserver import start_forked_workers
+from src.olaf.session_bundle import (SESSION_BUNDLE_ROUTE, BUNDLE_LOCUSTFILE, WORKER_TOKEN_HEADER,
+                                     extract_session_bundle, read_bundle_manifest)
+
+logger = logging.getLogger()
+
+POLL_INTERVAL = 5
+
+
+class RemoteWorkerSettings(BaseSettings):
+    OLAF_MASTER_HOST: str
+    OLAF_MASTER_WEB_PORT: int = 12311
+    OLAF_MASTER_BIND_PORT: int = 5557
+    OLAF_WORKER_PROCESSES: Optional[int] = None
+    OLAF_FORK_WORKERS: bool = True
+    # presented to the master, which serves the session bundle only to workers holding its OLAF_WORKER_TOKEN
+    OLAF_WORKER_TOKEN: str
+
+    class Config:
+        extra = Extra.ignore
+
+
+def fetch_session_bundle(settings: RemoteWorkerSettings) -> Optional[bytes]:
+    url = f"http://{settings.OLAF_MASTER_HOST}:{settings.OLAF_MASTER_WEB_PORT}{SESSION_BUNDLE_ROUTE}"
+    req = urllib.request.Request(url, headers={WORKER_TOKEN_HEADER: settings.OLAF_WORKER_TOKEN})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.read()
+    except urllib.error.HTTPError as err:
+        if err.code == 403:
+            logger.warning(f"master refused the session bundle: {err.read().decode('utf-8', 'replace')}")
+        return None
+    except OSError:
+        # no session running on the master yet
+        return None
+
+
+def run_session(settings: RemoteWorkerSettings, bundle: bytes):
+    session_path, manifest = extract_session_bundle(bundle, SESSION_CREATION_PATH)
+    args = ["locust", "--loglevel", "WARNING",
+            "-f", str(session_path / BUNDLE_LOCUSTFILE),
+            "--host", manifest["host"],
+            "--session_dir", str(session_path),
+            "--worker",
+            "--master-host", settings.OLAF_MASTER_HOST,
+            "--master-port", str(settings.OLAF_MASTER_BIND_PORT),
+            ] + manifest["worker_args"]
+    # no master runs here, every usable core gets a worker
+    worker_plan = plan_workers(settings.OLAF_WORKER_PROCESSES, reserve_master_cpu=False)
+    logger.warning(f"joining session {manifest['session_dir']} with {worker_plan.num_workers} workers")
+    processes = None
+    if settings.OLAF_FORK_WORKERS:
+        try:
+            processes = [start_forked_workers(args[1:], worker_plan.worker_cpus, session_dir=session_path)[0]]
+        except RuntimeError as err:
+            logger.warning(f"{err}, starting every worker on its own")
+    if processes is None:
+        processes = [Popen(args, preexec_fn=pin_to([cpu])) for cpu in worker_plan.worker_cpus]
+    for p in processes:
+        p.wait()
+
+    # raw timings are written next to the workers, the rest of the session is uploaded by the master
+    if (session_path / RAW_TIMINGS_DIRNAME).exists():
+        start_session_upload(session_path, include=[RAW_TIMINGS_DIRNAME])
+
+
+def main():
+    settings = RemoteWorkerSettings()
+    last_session_dir = None
+    while True:
+        bundle = fetch_session_bundle(settings)
+        # a master that is still up after its test ended keeps serving the same bundle
+        if bundle is not None:
+            session_dir = read_bundle_manifest(bundle)["session_dir"]
+            if session_dir != last_session_dir:
+                run_session(settings, bundle)
+                last_session_dir = session_dir
+        time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
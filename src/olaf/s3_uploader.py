@@ -1,22 +1,131 @@
+import gzip
+import json
 import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from subprocess import Popen
+from typing import List, Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 
+from src.constants import ROOT_PATH, RAW_TIMINGS_DIRNAME, RAW_TIMINGS_DONE_SUFFIX
 from src.streamlit_app.datamodel import service_config
 
+UPLOAD_STATUS_FILENAME = "upload_status.json"
+# artifacts that shrink well, raw timing logs and payload corpora are binary and left as is
+COMPRESSIBLE_SUFFIXES = {".csv", ".html", ".hgrm", ".json"}
+POLL_INTERVAL = 0.5
 
-def upload_session_dir(session_dir_path: Path):
-    if not service_config.aws_config.key.get_secret_value() or not service_config.aws_config.secret.get_secret_value():
+
+def is_upload_configured() -> bool:
+    aws_config = service_config.aws_config
+    return bool(aws_config.key.get_secret_value() and aws_config.secret.get_secret_value())
+
+
+def write_upload_status(session_dir_path: Path, status: str, **details):
+    # written through a rename, readers never see a half written status
+    tmp_path = session_dir_path / f".{UPLOAD_STATUS_FILENAME}"
+    with open(tmp_path, "w") as f:
+        json.dump({"status": status, "updated_at": time.time(), **details}, f)
+    os.replace(tmp_path, session_dir_path / UPLOAD_STATUS_FILENAME)
+
+
+def read_upload_status(session_dir_path: Path):
+    try:
+        with open(Path(session_dir_path) / UPLOAD_STATUS_FILENAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _upload_file(s3_client, transfer_config, file_path: str, key: str, compress: bool) -> int:
+    if compress and Path(file_path).suffix in COMPRESSIBLE_SUFFIXES:
+        with tempfile.NamedTemporaryFile(suffix=".gz") as compressed:
+            with open(file_path, "rb") as src, gzip.GzipFile(fileobj=compressed, mode="wb") as dst:
+                shutil.copyfileobj(src, dst)
+            compressed.flush()
+            s3_client.upload_file(Filename=compressed.name, Bucket=service_config.s3_config.bucket_name,
+                                  Key=f"{key}.gz", Config=transfer_config)
+            return os.path.getsize(compressed.name)
+    s3_client.upload_file(Filename=file_path, Bucket=service_config.s3_config.bucket_name, Key=key,
+                          Config=transfer_config)
+    return os.path.getsize(file_path)
+
+
+def pending_raw_timing_logs(session_dir_path: Path) -> List[str]:
+    # raw timing logs not closed by their worker yet, a worker killed before quitting leaves its log pending
+    log_path = session_dir_path / RAW_TIMINGS_DIRNAME
+    if not log_path.is_dir():
+        return []
+    return sorted(fname for fname in os.listdir(log_path)
+                  if fname.endswith(".bin") and not (log_path / f"{fname}{RAW_TIMINGS_DONE_SUFFIX}").exists())
+
+
+def wait_for_raw_timing_logs(session_dir_path: Path, timeout: float) -> List[str]:
+    deadline = time.monotonic() + timeout
+    pending = pending_raw_timing_logs(session_dir_path)
+    while pending and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        pending = pending_raw_timing_logs(session_dir_path)
+    return pending
+
+
+def upload_session_dir(session_dir_path: Path, include: Optional[List[str]] = None):
+    session_dir_path = Path(session_dir_path)
+    if not is_upload_configured():
+        write_upload_status(session_dir_path, "skipped")
         return
+    s3_config = service_config.s3_config
+    # one client shared by the pool, boto3 clients are thread safe
     s3_client = boto3.client('s3',
                              aws_access_key_id=service_config.aws_config.key.get_secret_value(),
                              aws_secret_access_key=service_config.aws_config.secret.get_secret_value(), )
+    transfer_config = TransferConfig(max_concurrency=s3_config.multipart_concurrency)
     dir_name = session_dir_path.stem.replace("__", "/")
-    prefix_path = service_config.s3_config.base_path
-    s3_upload_path = os.path.join(prefix_path, dir_name)
-    for fname in os.listdir(session_dir_path):
-        s3_client.upload_file(Filename=os.path.join(session_dir_path, fname),
-                              Bucket=service_config.s3_config.bucket_name,
-                              Key=os.path.join(s3_upload_path, fname)
-                              )
+    s3_upload_path = os.path.join(s3_config.base_path, dir_name)
+
+    # workers may still be flushing their logs after the master quit, their files are only walked once closed
+    incomplete_logs = wait_for_raw_timing_logs(session_dir_path, s3_config.raw_timing_timeout)
+
+    uploads = {}
+    for walk_root in [session_dir_path / entry for entry in include] if include else [session_dir_path]:
+        for dir_path, _, fnames in os.walk(walk_root):
+            for fname in fnames:
+                file_path = os.path.join(dir_path, fname)
+                if fname not in (UPLOAD_STATUS_FILENAME, f".{UPLOAD_STATUS_FILENAME}"):
+                    uploads[file_path] = os.path.join(s3_upload_path, os.path.relpath(file_path, session_dir_path))
+
+    started_at = time.time()
+    write_upload_status(session_dir_path, "uploading", files=len(uploads), started_at=started_at)
+    errors = {}
+    uploaded_bytes = 0
+    with ThreadPoolExecutor(max_workers=s3_config.upload_concurrency) as pool:
+        futures = {pool.submit(_upload_file, s3_client, transfer_config, file_path, key, s3_config.compress): file_path
+                   for file_path, key in uploads.items()}
+        for future, file_path in futures.items():
+            try:
+                uploaded_bytes += future.result()
+            except Exception as err:
+                errors[os.path.relpath(file_path, session_dir_path)] = str(err)
+
+    status = "failed" if errors else "incomplete" if incomplete_logs else "done"
+    write_upload_status(session_dir_path, status,
+                        files=len(uploads), bytes=uploaded_bytes, errors=errors, incomplete_logs=incomplete_logs,
+                        started_at=started_at, finished_at=time.time())
+
+
+def start_session_upload(session_dir_path: Path, include: Optional[List[str]] = None):
+    # detached, so neither the quitting master nor a worker waits for the transfer, include limits the upload to
+    # these entries of the session dir
+    write_upload_status(Path(session_dir_path), "pending")
+    Popen([sys.executable, "-m", "src.olaf.s3_uploader", str(session_dir_path)] + (include or []),
+          cwd=ROOT_PATH.parent, start_new_session=True)
+
+
+if __name__ == "__main__":
+    upload_session_dir(Path(sys.argv[1]), sys.argv[2:] or None)
@@ -0,0 +1,96 @@
+import hmac
+import io
+import json
+import os
+import tarfile
+from pathlib import Path
+from typing import Optional
+
+from src.constants import RAW_TIMINGS_DIRNAME
+from src.olaf.latency_histograms import HGRM_DIRNAME
+from src.streamlit_app.datamodel import service_settings
+
+SESSION_BUNDLE_ROUTE = "/olaf/session_bundle"
+WORKER_TOKEN_HEADER = "X-Olaf-Worker-Token"
+BUNDLE_MANIFEST = "bundle_manifest.json"
+BUNDLE_LOCUSTFILE = "bundle_locustfile.py"
+# produced while the test runs, a worker joining late must not pull them
+SKIPPED_ENTRIES = {RAW_TIMINGS_DIRNAME, HGRM_DIRNAME}
+
+# olaf options every worker must run with, a remote worker gets them from the master's command line
+WORKER_OPTIONS = ["arrival_mode", "worker_rps", "worker_rate_share", "co_correction", "hdr_significant_figures",
+                  "raw_timing_log", "raw_timing_capacity", "generator_overhead", "overhead_threshold_ms"]
+
+
+def add_bundle_args(parser):
+    parser.add_argument("--remote_workers", type=int, default=0,
+                        help="worker processes of worker containers expected to join, the session bundle is only "
+                             "served when there are any")
+
+
+def bundle_refusal(token: Optional[str]) -> Optional[str]:
+    # params.json carries the target's credentials, encrypted with ENCRYPTION_KEY
+    if not service_settings.OLAF_WORKER_TOKEN:
+        return "OLAF_WORKER_TOKEN is not set on the master"
+    if not token or not hmac.compare_digest(token, service_settings.OLAF_WORKER_TOKEN):
+        return "worker token does not match OLAF_WORKER_TOKEN of the master"
+    if not service_settings.ENCRYPTION_KEY:
+        return "ENCRYPTION_KEY is not set on the master, session params would be served decryptable"
+    return None
+
+
+def forwarded_worker_args(options):
+    args = []
+    for option in WORKER_OPTIONS:
+        value = getattr(options, option)
+        if isinstance(value, bool):
+            args += [f"--{option}"] if value else []
+        else:
+            args += [f"--{option}", str(value)]
+    return args
+
+
+def build_session_bundle(options) -> bytes:
+    session_path = Path(options.session_dir)
+    manifest = {
+        "session_dir": session_path.name,
+        "host": options.host,
+        "worker_args": forwarded_worker_args(options),
+    }
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for entry in os.listdir(session_path):
+            if entry not in SKIPPED_ENTRIES:
+                # directories hold the payload corpora of cocktail endpoints
+                tar.add(session_path / entry, arcname=entry)
+        tar.add(options.locustfile, arcname=BUNDLE_LOCUSTFILE)
+        manifest_data = json.dumps(manifest).encode("utf-8")
+        manifest_info = tarfile.TarInfo(BUNDLE_MANIFEST)
+        manifest_info.size = len(manifest_data)
+        tar.addfile(manifest_info, io.BytesIO(manifest_data))
+    return buf.getvalue()
+
+
+def read_bundle_manifest(data: bytes):
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        return json.load(tar.extractfile(BUNDLE_MANIFEST))
+
+
+def is_safe_member(name) -> bool:
+    # a bundle only writes inside its own session dir
+    path = Path(name)
+    return not path.is_absolute() and ".." not in path.parts
+
+
+def extract_session_bundle(data: bytes, sessions_path: Path):
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        manifest = json.load(tar.extractfile(BUNDLE_MANIFEST))
+        session_path = sessions_path / Path(manifest["session_dir"]).name
+        session_path.mkdir(parents=True, exist_ok=True)
+        for member in tar.getmembers():
+            if member.isfile() and member.name != BUNDLE_MANIFEST and is_safe_member(member.name):
+                member_path = session_path / member.name
+                member_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(member_path, "wb") as f:
+                    f.write(tar.extractfile(member).read())
+    return session_path, manifest
@@ -0,0 +1,41 @@
+import time
+
+from locust import events
+from locust.env import Environment
+from locust.runners import MasterRunner
+from locust.stats import RequestStats, StatsEntry, sort_stats
+
+SPAWN_STATS_KEY = "olaf_user_spawn"
+SPAWN_METHOD = "user_spawn"
+
+# kept apart from environment.stats, a user's one-off start-up is not a request to the target
+spawn_stats = RequestStats()
+
+
+def record_user_spawn(user, spawn_start_time):
+    spawn_stats.log_request(SPAWN_METHOD, type(user).__name__, (time.perf_counter() - spawn_start_time) * 1000, 0)
+
+
+def on_report_to_master(client_id, data, **kwargs):
+    data[SPAWN_STATS_KEY] = spawn_stats.serialize_stats()
+
+
+def on_worker_report(client_id, data, **kwargs):
+    for stats_data in data.get(SPAWN_STATS_KEY, []):
+        entry = StatsEntry.unserialize(stats_data)
+        spawn_stats.get(entry.name, entry.method).extend(entry)
+
+
+def enable_spawn_stats(environment: Environment):
+    if isinstance(environment.runner, MasterRunner):
+        events.worker_report.add_listener(on_worker_report)
+    else:
+        events.report_to_master.add_listener(on_report_to_master)
+
+
+def spawn_csv(writer):
+    writer.writerow(["User Class", "Users Spawned", "Average (ms)", "50% (ms)", "95% (ms)", "Max (ms)"])
+    for entry in sort_stats(spawn_stats.entries):
+        writer.writerow([entry.name, entry.num_requests, round(entry.avg_response_time, 3),
+                         entry.median_response_time, entry.get_response_time_percentile(0.95),
+                         entry.max_response_time])
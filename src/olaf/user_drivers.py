@@ -1,22 +1,51 @@
+import logging
 import os
 import typing
+from collections import namedtuple
 from datetime import datetime
+from pathlib import Path
 from subprocess import Popen
 from urllib.parse import quote_plus
 
 import randomname
 from jinja2 import Template
 
-from src.constants import ROOT_PATH, PARAMS_JSON_FILENAME, SESSION_CREATION_PATH, USER_TEMPLATE_PATH, USER_CONCRETE_PATH
+from src.constants import ROOT_PATH, PARAMS_JSON_FILENAME, SESSION_CREATION_PATH, USER_TEMPLATE_PATH
 from src.olaf.datamodel import (ElasticsearchUserParams, MongoDBUserParams, RestGetUserParams, LambdaUserParams,
                                 RestPostUserParams, CocktailUserParams, KafkaProducerUserParams,
                                 SagemakerUserParams, SessionDirectory, SQSUserParams, SNSUserParams,
                                 RedisStreamUserParams, RedisVectorSearchUserParams, PineConeVectorSearchUserParams)
 from src.olaf.datamodel import (RestGetNt, MongoDbNt, RestPostNt, ElasticsearchNt,
                                 SagemakerNt, LambdaNt, SqsNt, SnsNt, KafkaProducerNt, RedisStreamNt, RedisVectorSearchNt,
-                                PineConeVectorSearchNt)
+                                PineConeVectorSearchNt, CocktailEndpointNt)
+from src.olaf.payload_corpus import compile_payload_corpus, encode_json, encode_lambda_event, endpoint_dir
+from src.olaf.worker_sizing import plan_workers, pin_to
+from src.olaf.worker_forkserver import start_forked_workers
 from src.streamlit_app.datamodel import OlafAdvancedParams, LocustConfig
 
+logger = logging.getLogger()
+
+LocustSessionNt = namedtuple("LocustSessionNt", "p_ids, session_dir")
+
+# users that send from a compiled payload corpus, and how their payloads are encoded
+CORPUS_ENCODERS = {
+    "rest_post": encode_json,
+    "sqs": encode_json,
+    "sns": encode_json,
+    "lambda": encode_lambda_event,
+}
+
+REST_USER_PATHS = {
+    "rest_get": {
+        "requests": "olaf/locust_users/rest_get_user.py",
+        "fasthttp": "olaf/locust_users/rest_get_fasthttp_user.py",
+    },
+    "rest_post": {
+        "requests": "olaf/locust_users/rest_post_user.py",
+        "fasthttp": "olaf/locust_users/rest_post_fasthttp_user.py",
+    },
+}
+
 
 def create_session_dir_name(fields) -> str:
     fields.append(datetime.now())
@@ -30,9 +59,10 @@ def write_session_params(data, path):
         f.write(data)
 
 
-def render_custom_load_template(template_name, **template_kwargs):
+def render_custom_load_template(template_name, session_dir, **template_kwargs):
     src_template_path = USER_TEMPLATE_PATH / f"{template_name}_template.py.j2"
-    dst_template_path = USER_CONCRETE_PATH / f"{template_name}_custom.py"
+    # rendered into the session dir, concurrent sessions each run their own locustfile
+    dst_template_path = Path(session_dir) / f"{template_name}_custom.py"
     assert src_template_path.exists()
     with src_template_path.open("r") as f:
         python_file = f.read()
@@ -45,43 +75,87 @@ def render_custom_load_template(template_name, **template_kwargs):
     return dst_template_path
 
 
+def start_workers(worker_args, cpus, fork=True):
+    if fork:
+        try:
+            # "nohup locust" is replaced by the fork server, which imports the locustfile once for every worker
+            _, p_ids = start_forked_workers(worker_args[2:], cpus,
+                                            session_dir=worker_args[worker_args.index("--session_dir") + 1])
+            return p_ids
+        except RuntimeError as err:
+            logger.warning(f"{err}, starting every worker on its own")
+    return [Popen(worker_args, preexec_fn=pin_to([cpu])).pid for cpu in cpus]
+
+
 def start_locust(args,
                  locust_config: LocustConfig,
                  has_custom_load_shape: bool = False,
                  mode="multi_proc",
-                 num_slaves=os.cpu_count() - 1,
+                 num_slaves=None,
                  advanced_params: OlafAdvancedParams = None,
                  ):
     p_ids = []
+    if num_slaves is None and advanced_params and advanced_params.num_workers:
+        num_slaves = advanced_params.num_workers
+    # sized from the container's cpu quota, affinity and memory instead of the host's cpu count
+    worker_plan = plan_workers(num_slaves,
+                               session_slot=locust_config.session_slot,
+                               max_sessions=locust_config.max_sessions)
+    num_slaves = worker_plan.num_workers
+    remote_workers = advanced_params.remote_workers if advanced_params and mode == "multi_proc" else 0
+    if advanced_params and not has_custom_load_shape:
+        # a worker without users would leave its share of the target rate unsent
+        num_slaves = max(1, min(num_slaves, advanced_params.users - remote_workers))
+        if num_slaves + remote_workers > advanced_params.users:
+            logger.warning(f"{num_slaves + remote_workers} workers for {advanced_params.users} users, "
+                           f"workers without users leave their share of the target rate unsent")
     args = ["nohup", "locust"] + ["--loglevel", "WARNING"] + args
+    if advanced_params:
+        args += ["--hdr_significant_figures", str(advanced_params.hdr_significant_figures)]
+        if advanced_params.raw_timing_log:
+            args += ["--raw_timing_log"]
+        if advanced_params.generator_overhead:
+            args += ["--generator_overhead", "--overhead_threshold_ms", str(advanced_params.overhead_threshold_ms)]
+    # target rates are split evenly, every worker runs its own arrival schedules
+    num_workers = num_slaves + remote_workers if mode == "multi_proc" else 1
+    args += ["--worker_rate_share", str(1 / num_workers)]
+    if advanced_params and advanced_params.arrival_mode != "closed" and not has_custom_load_shape:
+        args += ["--arrival_mode", advanced_params.arrival_mode,
+                 "--worker_rps", str(advanced_params.target_rps / num_workers)]
+        if advanced_params.co_correction:
+            args += ["--co_correction"]
     if mode == "single_proc":
         p = Popen(args)
         p_ids.append(p.pid)
     elif mode == "multi_proc":
-        assert num_slaves is not None
-
-        worker_args = args + ["--worker"]
-        for n in range(num_slaves):
-            p = Popen(worker_args)
-            p_ids.append(p.pid)
+        worker_args = args + ["--worker"] \
+                      + ["--master-port", str(locust_config.master_bind_port)]
+        p_ids += start_workers(worker_args, worker_plan.worker_cpus[:num_slaves],
+                               fork=advanced_params.fork_workers if advanced_params else True)
 
         master_args = args + ["--master"] \
                       + ["--web-port", str(locust_config.port)] \
+                      + ["--master-bind-port", str(locust_config.master_bind_port)] \
                       + ["--stop-timeout", "1"]
         if advanced_params:
-            master_args += ["--autostart"]
+            # autostart only waits for --expect-workers (1 by default), so every worker gets its share before the
+            # run starts rather than the first one to connect taking them all
+            master_args += ["--autostart", "--expect-workers", str(num_slaves + remote_workers)]
+            if remote_workers:
+                # remote workers join with the session bundle, only served to sessions expecting them
+                master_args += ["--remote_workers", str(remote_workers)]
             if not has_custom_load_shape:
                 master_args += ["--run-time", str(advanced_params.load_duration)]
                 master_args += ["--autoquit", str(advanced_params.autoquit_timeout)]
                 master_args += ["--users", str(advanced_params.users)]
                 master_args += ["--spawn-rate", str(advanced_params.spawn_rate)]
 
-        p = Popen(master_args)
+        p = Popen(master_args, preexec_fn=pin_to(worker_plan.master_cpus))
         p_ids.append(p.pid)
 
     else:
         raise NotImplementedError
-    return p_ids
+    return LocustSessionNt(p_ids, str(args[args.index("--session_dir") + 1]))
 
 
 def rest_get_driver(resource_args: RestGetNt,
@@ -102,14 +176,14 @@ def rest_get_driver(resource_args: RestGetNt,
 
     args = [
         "-f",
-        os.path.join(ROOT_PATH, "olaf/locust_users/rest_get_user.py"),
+        os.path.join(ROOT_PATH, REST_USER_PATHS["rest_get"][params.engine]),
         "--host", params.url,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def rest_post_driver(resource_args: RestPostNt,
@@ -128,17 +202,18 @@ def rest_post_driver(resource_args: RestPostNt,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
+    compile_payload_corpus(params.query_json, params.cur_session_dir)
 
     args = [
         "-f",
-        os.path.join(ROOT_PATH, "olaf/locust_users/rest_post_user.py"),
+        os.path.join(ROOT_PATH, REST_USER_PATHS["rest_post"][params.engine]),
         "--host", params.url,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def elasticsearch_read_driver(resource_args: ElasticsearchNt,
@@ -163,10 +238,10 @@ def elasticsearch_read_driver(resource_args: ElasticsearchNt,
         "--host", f"elasticsearch_{params.index_name}",
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def mongo_read_driver(resource_args: MongoDbNt,
@@ -192,10 +267,10 @@ def mongo_read_driver(resource_args: MongoDbNt,
         "--host", f"mongodb_{params.db_name}_{params.collection_name}",
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def sagemaker_inference_driver(resource_args: SagemakerNt,
@@ -221,10 +296,10 @@ def sagemaker_inference_driver(resource_args: SagemakerNt,
         "--session_dir", params.cur_session_dir,
     ]
 
-    p_ids = start_locust(args,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def aws_sqs_put_message_driver(resource_args: SqsNt,
@@ -242,12 +317,14 @@ def aws_sqs_put_message_driver(resource_args: SqsNt,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
+    compile_payload_corpus(params.query_json, params.cur_session_dir)
     user_path = os.path.join(ROOT_PATH, "olaf/locust_users/sqs_user.py")
     custom_load_shape_params = params.custom_load_shape_params
     has_custom_load_shape = False
 
     if custom_load_shape_params:
-        user_path = render_custom_load_template("sqs_user", **custom_load_shape_params.dict())
+        user_path = render_custom_load_template("sqs_user", params.cur_session_dir,
+                                                **custom_load_shape_params.dict())
         has_custom_load_shape = True
 
     args = [
@@ -256,11 +333,11 @@ def aws_sqs_put_message_driver(resource_args: SqsNt,
         "--host", params.sqs_name,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def aws_sns_put_driver(resource_args: SnsNt,
@@ -278,12 +355,14 @@ def aws_sns_put_driver(resource_args: SnsNt,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
+    compile_payload_corpus(params.query_json, params.cur_session_dir)
     user_path = os.path.join(ROOT_PATH, "olaf/locust_users/sns_user.py")
     custom_load_shape_params = resource_args.custom_load_shape_params
     has_custom_load_shape = False
 
     if custom_load_shape_params:
-        user_path = render_custom_load_template("sns_user", **custom_load_shape_params.dict())
+        user_path = render_custom_load_template("sns_user", params.cur_session_dir,
+                                                **custom_load_shape_params.dict())
         has_custom_load_shape = True
 
     args = [
@@ -292,11 +371,11 @@ def aws_sns_put_driver(resource_args: SnsNt,
         "--host", params.sns_arn,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def aws_lambda_driver(resource_args: LambdaNt,
@@ -314,6 +393,7 @@ def aws_lambda_driver(resource_args: LambdaNt,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
+    compile_payload_corpus(params.query_json, params.cur_session_dir, encoder=encode_lambda_event)
     user_path = os.path.join(ROOT_PATH, "olaf/locust_users/lambda_user.py")
     has_custom_load_shape = False
 
@@ -323,11 +403,11 @@ def aws_lambda_driver(resource_args: LambdaNt,
         "--host", params.lambda_arn,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def kafka_producer_driver(resource_args: KafkaProducerNt,
@@ -344,6 +424,7 @@ def kafka_producer_driver(resource_args: KafkaProducerNt,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
+    compile_payload_corpus(params.query_json, params.cur_session_dir)
 
     user_path = os.path.join(ROOT_PATH, "olaf/locust_users/kafka_producer_user.py")
 
@@ -355,11 +436,11 @@ def kafka_producer_driver(resource_args: KafkaProducerNt,
         "--host", params.topic_name,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def redis_stream_producer_driver(resource_args: RedisStreamNt,
@@ -387,11 +468,11 @@ def redis_stream_producer_driver(resource_args: RedisStreamNt,
         "--host", params.stream_name,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 def pine_cone_vector_search_driver(resource_args: PineConeVectorSearchNt,
                                    locust_config: LocustConfig,
@@ -412,11 +493,11 @@ def pine_cone_vector_search_driver(resource_args: PineConeVectorSearchNt,
         "--host", params.index_name,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def redis_vector_search_driver(resource_args: RedisVectorSearchNt,
@@ -441,25 +522,22 @@ def redis_vector_search_driver(resource_args: RedisVectorSearchNt,
         "--host", params.host,
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
 
 
 def cocktail_driver(resource_args: typing.List,
                     locust_config: LocustConfig,
                     advanced_params: OlafAdvancedParams,
                     load_session_name: str, ):
-    resource_args = list(map(lambda x: x._asdict(), filter(lambda x: x[0], resource_args)))
-    params = CocktailUserParams(user_resources=resource_args)
-
-    jinja_args = {}
-    for ndx, p in enumerate(params.user_resources):
-        l = jinja_args.get(p.kind, list())
-        l.append(ndx)
-        jinja_args[p.kind] = l
+    endpoints: typing.List[CocktailEndpointNt] = list(filter(lambda x: x.resource_args[0], resource_args))
+    params = CocktailUserParams(user_resources=[endpoint.resource_args._asdict() for endpoint in endpoints],
+                                endpoint_mix=[{"weight": endpoint.weight,
+                                               "fixed_count": endpoint.fixed_count,
+                                               "target_rps": endpoint.target_rps} for endpoint in endpoints])
 
     session_dir = create_session_dir_name([params.kind,
                                            load_session_name,
@@ -468,7 +546,13 @@ def cocktail_driver(resource_args: typing.List,
     params.cur_session_dir = SessionDirectory(session_dir=SESSION_CREATION_PATH / session_dir).session_dir
 
     write_session_params(params.json(), os.path.join(params.cur_session_dir, PARAMS_JSON_FILENAME))
-    user_path = render_custom_load_template("cocktail_user", **jinja_args)
+    for ndx, endpoint_params in enumerate(params.user_resources):
+        encoder = CORPUS_ENCODERS.get(endpoint_params.kind)
+        if encoder:
+            corpus_dir = SessionDirectory(session_dir=endpoint_dir(params.cur_session_dir, ndx)).session_dir
+            compile_payload_corpus(endpoint_params.query_json, corpus_dir, encoder=encoder)
+    # user classes are composed from the params file when locust loads it, one per endpoint
+    user_path = os.path.join(ROOT_PATH, "olaf/locust_users/cocktail_user.py")
     has_custom_load_shape = False
 
     args = [
@@ -477,8 +561,8 @@ def cocktail_driver(resource_args: typing.List,
         "--host", load_session_name or randomname.get_name(),
         "--session_dir", params.cur_session_dir,
     ]
-    p_ids = start_locust(args,
-                         has_custom_load_shape=has_custom_load_shape,
-                         locust_config=locust_config,
-                         advanced_params=advanced_params)
-    return p_ids
+    locust_session = start_locust(args,
+                                  has_custom_load_shape=has_custom_load_shape,
+                                  locust_config=locust_config,
+                                  advanced_params=advanced_params)
+    return locust_session
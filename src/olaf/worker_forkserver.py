@@ -0,0 +1,134 @@
+import argparse
+import ast
+import gc
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from subprocess import Popen, PIPE
+from typing import List
+
+from src.constants import ROOT_PATH
+from src.olaf.cocktail_endpoints import endpoint_user_modules
+from src.olaf.import_report import IMPORT_REPORT_FILENAME, timed_phase, rss_mb
+from src.olaf.params_cache import load_session_json
+from src.olaf.worker_sizing import pin_to
+
+logger = logging.getLogger()
+
+
+def locustfile_imports(locustfile) -> List[str]:
+    # modules the locustfile imports at its top level, read without running it
+    with open(locustfile) as f:
+        tree = ast.parse(f.read(), locustfile)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def preload_locustfile(locustfile, session_dir=None):
+    # imports what the locustfile imports (locust, gevent, the user module and its sdk) once. its body, and with it
+    # every listener it registers, runs only in the workers when locust loads the file
+    directory = os.path.dirname(os.path.abspath(locustfile))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    modules = locustfile_imports(locustfile)
+    if session_dir:
+        # cocktail users import the user of every endpoint from their body
+        modules += endpoint_user_modules(load_session_json(session_dir))
+    for module in modules:
+        importlib.import_module(module)
+
+
+def run_worker(cpu, pids_out):
+    pids_out.close()
+    pin_to([cpu])()
+    code = 1
+    try:
+        from locust.main import main as locust_main
+        locust_main()
+        code = 0
+    except SystemExit as err:
+        code = err.code if isinstance(err.code, int) else int(err.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # skips the parent's atexit handlers and buffers the child inherited
+        os._exit(code)
+
+
+def fork_workers(locust_args, cpus, report_path=None):
+    # the pids go back to the launcher on the original stdout, the workers print to stderr like any locust process
+    pids_out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.argv = ["locust"] + locust_args
+
+    phases = [timed_phase("locust", lambda: importlib.import_module("locust"))]
+    locustfile = locust_args[locust_args.index("-f") + 1]
+    session_dir = locust_args[locust_args.index("--session_dir") + 1] if "--session_dir" in locust_args else None
+    phases.append(timed_phase("locustfile", lambda: preload_locustfile(locustfile, session_dir)))
+    # preloaded objects are never collected again, so the collector leaves their pages shared with the workers
+    gc.collect()
+    gc.freeze()
+
+    fork_start = time.perf_counter()
+    pids = []
+    for cpu in cpus:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(cpu, pids_out)
+        pids.append(pid)
+    pids_out.write(json.dumps(pids) + "\n")
+    pids_out.close()
+
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump({
+                "locustfile": locustfile,
+                "workers": len(pids),
+                "phases": phases,
+                "preloaded_rss_mb": rss_mb(),
+                "fork_seconds": round(time.perf_counter() - fork_start, 3),
+            }, f, indent=2)
+
+    # reaps the workers, the launcher tracks and stops them by pid
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def start_forked_workers(locust_args, cpus, session_dir=None):
+    args = ["nohup", sys.executable, "-m", "src.olaf.worker_forkserver",
+            "--cpus", ",".join("-" if cpu is None else str(cpu) for cpu in cpus)]
+    if session_dir:
+        args += ["--report", str(Path(session_dir) / IMPORT_REPORT_FILENAME)]
+    forkserver = Popen(args + ["--"] + locust_args, stdout=PIPE, cwd=ROOT_PATH.parent)
+    line = forkserver.stdout.readline()
+    forkserver.stdout.close()
+    if not line:
+        raise RuntimeError(f"worker fork server exited with {forkserver.wait()} before starting any worker")
+    return forkserver, json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import a locustfile once and fork locust workers from it")
+    parser.add_argument("--cpus", type=str, required=True,
+                        help="comma separated cpu of every worker, - leaves a worker unpinned")
+    parser.add_argument("--report", type=str, default=None, help="json file the start-up phases are written to")
+    parser.add_argument("locust_args", nargs=argparse.REMAINDER)
+    options = parser.parse_args()
+    locust_args = options.locust_args[1:] if options.locust_args[:1] == ["--"] else options.locust_args
+    fork_workers(locust_args, [None if cpu == "-" else int(cpu) for cpu in options.cpus.split(",")], options.report)
+
+
+if __name__ == "__main__":
+    main()
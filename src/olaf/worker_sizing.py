@@ -0,0 +1,105 @@
+import math
+import os
+from collections import namedtuple
+from typing import List, Optional
+
+import psutil
+
+# memory a locust worker process is planned with, users and their clients included
+WORKER_MEMORY_BUDGET = 512 * 2 ** 20
+# cgroup v1 reports "no limit" as a page aligned value close to 2**63
+UNLIMITED_MEMORY = 2 ** 60
+
+WorkerPlan = namedtuple("WorkerPlan", "num_workers, master_cpus, worker_cpus")
+
+
+def _read_first_line(path) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    # cpus the container may use per period, None without a quota
+    cpu_max = _read_first_line("/sys/fs/cgroup/cpu.max")
+    if cpu_max is not None:
+        quota, period = cpu_max.split()
+        return None if quota == "max" else int(quota) / int(period)
+
+    quota = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota is None or period is None or int(quota) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    limit = _read_first_line("/sys/fs/cgroup/memory.max")
+    if limit is None:
+        limit = _read_first_line("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if limit is None or limit == "max" or int(limit) >= UNLIMITED_MEMORY:
+        return None
+    return int(limit)
+
+
+def usable_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def affinity_restricted(cpus: List[int]) -> bool:
+    # a cpuset (docker --cpuset-cpus, taskset) names the cores this container owns, otherwise every host core is listed
+    return len(cpus) < os.cpu_count()
+
+
+def available_memory() -> int:
+    available = psutil.virtual_memory().available
+    limit = cgroup_memory_limit()
+    if limit is not None:
+        available = min(available, limit - psutil.Process().memory_info().rss)
+    return available
+
+
+def session_cpus(cpus: List[Optional[int]], session_slot: int, max_sessions: int) -> List[Optional[int]]:
+    # concurrent sessions get disjoint, contiguous shares of the cpus, or share round robin when there are fewer cpus
+    if len(cpus) < max_sessions:
+        return [cpus[session_slot % len(cpus)]]
+    share = len(cpus) // max_sessions
+    return cpus[session_slot * share:(session_slot + 1) * share]
+
+
+def plan_workers(num_workers: Optional[int] = None, reserve_master_cpu: bool = True,
+                 session_slot: int = 0, max_sessions: int = 1) -> WorkerPlan:
+    cpus = usable_cpus()
+    restricted = affinity_restricted(cpus)
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = cpus[:max(1, math.floor(quota))]
+    if not restricted:
+        # a quota alone says how many cores, not which. pinning to the first ones would stack every container of the
+        # host on the same cores, so the processes stay unpinned (None) and the scheduler places them
+        cpus = [None] * len(cpus)
+    cpus = session_cpus(cpus, session_slot, max_sessions)
+
+    # the master gets a core of its own when there is more than one to go around
+    master_cpus = cpus[:1] if reserve_master_cpu and len(cpus) > 1 else cpus
+    worker_cpus = cpus[1:] if reserve_master_cpu and len(cpus) > 1 else cpus
+
+    if num_workers is None:
+        memory_share = available_memory() // max_sessions
+        num_workers = min(len(worker_cpus), max(1, memory_share // WORKER_MEMORY_BUDGET))
+    return WorkerPlan(num_workers, master_cpus, [worker_cpus[n % len(worker_cpus)] for n in range(num_workers)])
+
+
+def pin_to(cpus):
+    # used as preexec_fn of a Popen, pins the child before it execs. None leaves it unpinned
+    cpus = {cpu for cpu in cpus if cpu is not None}
+
+    def pin():
+        if cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+
+    return pin
@@ -5,7 +5,8 @@ import streamlit as st
 
 from src.constants import (DEFAULT_QUERY_JSON, DEFAULT_MESSAGE_ATTRIBUTES, DEFAULT_OLAF_SCHEDULE,
                            DEFAULT_KAFKA_CONFIG, DEFAULT_KAFKA_PRODUCER_CONFIG, AWS_REGIONS,
-                           SAGEMAKER_SERIALIZERS, SAGEMAKER_DESERIALIZERS, SAGEMAKER_PREDICTORS, )
+                           SAGEMAKER_SERIALIZERS, SAGEMAKER_DESERIALIZERS, SAGEMAKER_PREDICTORS, REST_ENGINES,
+                           KAFKA_PRODUCER_MODES, ARRIVAL_MODES, )
 from src.olaf.datamodel import (RestGetNt, MongoDbNt, RestPostNt, ElasticsearchNt,
                                 SagemakerNt, S3Nt, LambdaNt, SqsNt, SnsNt, KafkaProducerNt, RedisStreamNt,
                                 PineConeVectorSearchNt, RedisVectorSearchNt)
@@ -19,13 +20,15 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
     if test_type == "REST GET":
         url = st.text_input("URL", key=key)
         header_json = st.text_area("header JSON", key=key, value="{ }")
-        return_args = RestGetNt(url, header_json)
+        engine = get_rest_engine_input(key=key)
+        return_args = RestGetNt(url, header_json, engine)
 
     elif test_type == "REST POST":
         url = st.text_input(f"URL", key=key)
         header_json = st.text_area(f"header JSON", key=key, value="{ }")
         query_json = get_query_json_text_input(key=key)
-        return_args = RestPostNt(url, header_json, query_json)
+        engine = get_rest_engine_input(key=key)
+        return_args = RestPostNt(url, header_json, query_json, engine)
 
     elif test_type == "Elasticsearch":
         url = st.text_input("ES URL", key=key)
@@ -36,7 +39,8 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
             secret_key = st.text_input("ES password", type="password", key=key)
         index_name = st.text_input("ES index name", key=key)
         query_json = get_query_json_text_input(key=key)
-        return_args = ElasticsearchNt(url, access_key, secret_key, index_name, query_json)
+        max_pool_connections = get_max_pool_connections_input(key=key)
+        return_args = ElasticsearchNt(url, access_key, secret_key, index_name, query_json, max_pool_connections)
 
     elif test_type == "MongoDB":
         url = st.text_input("Mongo URL in SRV format", key=key)
@@ -46,7 +50,8 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
         with b:
             collection_name = st.text_input("Collection", key=key)
         query_json = get_query_json_text_input(key=key)
-        return_args = MongoDbNt(url, db_name, collection_name, query_json)
+        max_pool_connections = get_max_pool_connections_input(key=key)
+        return_args = MongoDbNt(url, db_name, collection_name, query_json, max_pool_connections)
 
     elif test_type == "Sagemaker":
         endpoint = st.text_input("Sagemaker endpoint", key=key)
@@ -89,10 +94,11 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
                                           min_value=2, max_value=100, step=1)
 
         query_json = get_query_json_text_input(key=key)
+        max_pool_connections = get_max_pool_connections_input(key=key)
         return_args = SagemakerNt(
             endpoint, predictor_type, input_serializer, output_deserializer,
             aws_region, access_key, secret_key, session_token,
-            multi_model, batch_mode, batch_value, query_json)
+            multi_model, batch_mode, batch_value, query_json, max_pool_connections)
 
     elif test_type == "SQS":
         sqs_name = st.text_input("SQS Name", key=key, )
@@ -100,8 +106,12 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
         query_json = get_query_json_text_input(key=key, )
         message_attribute_json = get_message_attribute_input(key=key, )
         custom_load_shape_params = get_custom_load_shape_params(is_cocktail=is_cocktail, key=key, )
+        max_pool_connections = get_max_pool_connections_input(key=key)
+        batch_mode, batch_value, partial_failure_accounting = get_message_batch_input(
+            key=key, help="messages are sent with send_message_batch, up to 10 messages per call")
         return_args = SqsNt(sqs_name, aws_region, access_key, secret_key, session_token,
-                            query_json, message_attribute_json, custom_load_shape_params)
+                            query_json, message_attribute_json, custom_load_shape_params, max_pool_connections,
+                            batch_mode, batch_value, partial_failure_accounting)
 
     elif test_type == "SNS":
         sns_arn = st.text_input("SNS ARN")
@@ -109,14 +119,20 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
         query_json = get_query_json_text_input(key=key, )
         message_attribute_json = get_message_attribute_input(key=key, )
         custom_load_shape_params = get_custom_load_shape_params(is_cocktail=is_cocktail, key=key, )
+        max_pool_connections = get_max_pool_connections_input(key=key)
+        batch_mode, batch_value, partial_failure_accounting = get_message_batch_input(
+            key=key, help="messages are published with publish_batch, up to 10 messages per call")
         return_args = SnsNt(sns_arn, aws_region, access_key, secret_key, session_token,
-                            query_json, message_attribute_json, custom_load_shape_params)
+                            query_json, message_attribute_json, custom_load_shape_params, max_pool_connections,
+                            batch_mode, batch_value, partial_failure_accounting)
 
     elif test_type == "Lambda":
         lambda_arn = st.text_input("Lambda ARN")
         aws_region, access_key, secret_key, session_token = get_aws_info(key=key, )
         query_json = get_query_json_text_input(key=key, )
-        return_args = LambdaNt(lambda_arn, aws_region, access_key, secret_key, session_token, query_json, )
+        max_pool_connections = get_max_pool_connections_input(key=key)
+        return_args = LambdaNt(lambda_arn, aws_region, access_key, secret_key, session_token, query_json,
+                               max_pool_connections)
 
     elif test_type == "S3":
         st.error("page under development!")
@@ -145,8 +161,16 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
 
         stream_name = st.text_input("Stream Name", key=key)
         query_json = get_query_json_text_input(key=key)
+
+        a, b = st.columns(2)
+        with a:
+            pipeline_depth = st.number_input("pipeline depth", min_value=1, max_value=10000, value=1, key=key,
+                                             help="entries sent per pipeline flush, 1 sends one XADD per request")
+        with b:
+            maxlen = st.number_input("approximate MAXLEN", min_value=0, value=0, step=1000, key=key,
+                                     help="trim the stream to about this many entries, 0 disables trimming")
         return_args = RedisStreamNt(redis_type, host, port, username, password, stream_name,
-                                    query_json)
+                                    query_json, pipeline_depth, maxlen or None)
 
     elif test_type == "Kafka Producer":
         st.info("experimental feature")
@@ -161,8 +185,18 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
                                                       value=DEFAULT_KAFKA_PRODUCER_CONFIG, key=key)
         topic_name = st.text_input("Topic Name", key=key)
         query_json = get_query_json_text_input(key=key)
+        a, b = st.columns(2)
+        with a:
+            producer_mode = st.selectbox("producer mode", options=KAFKA_PRODUCER_MODES, key=key,
+                                         help="sync flushes every record, async keeps a window of records in "
+                                              "flight and measures each one from send to broker ack")
+        with b:
+            max_in_flight = st.number_input("max in flight", min_value=1, max_value=100000, value=1000, step=100,
+                                            key=key, disabled=producer_mode != "async",
+                                            help="records per user awaiting an ack before the user blocks")
         return_args = KafkaProducerNt(bootstrap_server, ssl_username, ssl_password, topic_name,
-                                      kafka_config_json, kafka_producer_config_json, query_json)
+                                      kafka_config_json, kafka_producer_config_json, query_json, producer_mode,
+                                      max_in_flight)
 
 
     elif test_type == "PineCone Vector Search":
@@ -175,7 +209,9 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
         with c:
             index_name = st.text_input("Index Name", key=key)
         query_json = get_query_json_text_input(key=key)
-        return_args = PineConeVectorSearchNt(api_key, environment_name, index_name, query_json)
+        max_in_flight = st.number_input("max in flight", min_value=1, max_value=1000, value=1, key=key,
+                                        help="concurrent queries per user, each one is reported with its own latency")
+        return_args = PineConeVectorSearchNt(api_key, environment_name, index_name, query_json, max_in_flight)
 
     elif test_type == "Redis Vector Search":
         st.info("experimental feature")
@@ -199,6 +235,22 @@ def show_core_services(test_type, is_cocktail=False, key=0) -> typing.Union[Rest
     return return_args
 
 
+def get_cocktail_mix_input(key=0) -> typing.Tuple[int, typing.Optional[int], typing.Optional[float]]:
+    a, b, c = st.columns(3)
+    with a:
+        weight = st.number_input("weight", min_value=1, max_value=1000, value=1, step=1, key=key,
+                                 help="share of the users given to this endpoint, relative to the other endpoints")
+    with b:
+        fixed_count = st.number_input("fixed users", min_value=0, max_value=500, value=0, step=1, key=key,
+                                      help="0 follows the weight, otherwise exactly this many users run the endpoint")
+    with c:
+        target_rps = st.number_input("endpoint target rps", min_value=0.0, max_value=100000.0, value=0.0,
+                                     step=10.0, key=key,
+                                     help="0 sends as fast as its users can, otherwise the endpoint holds this rate "
+                                          "on its own, split evenly across workers")
+    return weight, fixed_count or None, target_rps or None
+
+
 def get_query_json_text_input(key=0):
     a, b = st.columns([1, 5])
 
@@ -226,6 +278,38 @@ def get_message_attribute_input(name="message Attribute JSON", key=0, ):
     return message_attribute_json
 
 
+def get_rest_engine_input(key=0):
+    engine = st.selectbox("HTTP engine", options=REST_ENGINES, key=key,
+                          help="fasthttp uses locust's geventhttpclient based FastHttpUser for higher RPS per core")
+    return engine
+
+
+def get_max_pool_connections_input(key=0):
+    max_pool_connections = st.number_input("max pool connections", min_value=1, max_value=1000, value=100, step=10,
+                                           key=key,
+                                           help="connections to the target shared by all users of a worker, "
+                                                "which also caps the requests a worker has in flight to it")
+    return max_pool_connections
+
+
+def get_message_batch_input(key=0, help=None):
+    batch_mode = st.checkbox("enable batch mode", key=key, help=help)
+    batch_value = None
+    partial_failure_accounting = False
+
+    if batch_mode:
+        a, b = st.columns(2)
+        with a:
+            batch_value = st.number_input("batch value", key=key,
+                                          min_value=2, max_value=10, step=1)
+        with b:
+            partial_failure_accounting = st.checkbox("partial failure accounting", key=key,
+                                                     help="count failed entries of a batch one by one instead of "
+                                                          "failing the whole batch")
+
+    return batch_mode, batch_value, partial_failure_accounting
+
+
 def get_aws_info(key=0):
     a, b, c = st.columns(3)
 
@@ -271,12 +355,62 @@ def get_advanced_usage_params() -> typing.Union[None, typing.Dict]:
                 spawn_rate = st.number_input("spawn rate", min_value=0.1, max_value=500.0, value=1.0, step=0.1,
                                              help="ramp up period")
 
+            a, b = st.columns(2)
+            with a:
+                arrival_mode = st.selectbox("arrival mode", options=ARRIVAL_MODES,
+                                            help="closed: every user waits for its response, fixed/poisson: requests "
+                                                 "start on a schedule at target rps, users cap the concurrency")
+            with b:
+                target_rps = st.number_input("target rps", min_value=1.0, max_value=100000.0, value=100.0,
+                                             step=10.0, disabled=arrival_mode == "closed",
+                                             help="total arrival rate, split evenly across workers")
+            co_correction = st.checkbox("coordinated omission correction", disabled=arrival_mode == "closed",
+                                        help="also report latency measured from the scheduled start of every "
+                                             "request, so time spent behind a stalled target is counted")
+
+            hdr_significant_figures = st.number_input("latency histogram precision", min_value=1, max_value=5,
+                                                      value=3, step=1,
+                                                      help="significant figures kept for every latency, "
+                                                           "3 resolves 1ms to 1us and 1s to 1ms")
+            num_workers = st.number_input("local worker processes", min_value=0, max_value=512, value=0, step=1,
+                                          help="0 sizes the workers from the container's cpu quota and memory, "
+                                               "one pinned core each with a core kept for the master")
+            remote_workers = st.number_input("remote worker processes", min_value=0, max_value=1000, value=0,
+                                             step=1,
+                                             help="worker processes of olaf worker containers expected to join, "
+                                                  "the run starts once they are connected")
+            fork_workers = st.checkbox("fork workers", value=True,
+                                       help="import the user and its sdk once and fork the local workers from it, "
+                                            "instead of starting every worker as a fresh interpreter")
+            raw_timing_log = st.checkbox("raw timing log",
+                                         help="keep timestamp, latency, bytes and error of every request in "
+                                              "raw_timings/ of the session directory")
+            a, b = st.columns(2)
+            with a:
+                generator_overhead = st.checkbox("generator overhead", value=True,
+                                                 help="record scheduling lag and request preparation time of the "
+                                                      "workers, to tell a slow target from a saturated generator")
+            with b:
+                overhead_threshold_ms = st.number_input("overhead threshold ms", min_value=0.1, max_value=10000.0,
+                                                        value=5.0, step=1.0, disabled=not generator_overhead,
+                                                        help="p95 overhead above which the session is flagged")
+
             advanced_params = {
                 "autoquit_timeout": autoquit_timeout,
                 "autostart": autostart,
                 "users": users,
                 "spawn_rate": spawn_rate,
                 "load_duration": load_duration,
+                "arrival_mode": arrival_mode,
+                "target_rps": target_rps if arrival_mode != "closed" else None,
+                "co_correction": co_correction and arrival_mode != "closed",
+                "hdr_significant_figures": hdr_significant_figures,
+                "raw_timing_log": raw_timing_log,
+                "generator_overhead": generator_overhead,
+                "overhead_threshold_ms": overhead_threshold_ms,
+                "remote_workers": remote_workers,
+                "num_workers": num_workers or None,
+                "fork_workers": fork_workers,
             }
 
     return advanced_params
@@ -5,10 +5,13 @@ import typing
 import streamlit as st
 
 from src.constants import MAX_COCKTAIL_ENDPOINTS, CORE_SERVICES, EXPERIMENTAL_SERVICES, HIDE_ST_STYLE
-from src.streamlit_app.advanced_usage_ui import show_core_services, get_advanced_usage_params
+from src.olaf.datamodel import CocktailEndpointNt
+from src.streamlit_app.advanced_usage_ui import show_core_services, get_advanced_usage_params, get_cocktail_mix_input
 from src.streamlit_app.datamodel import OlafAdvancedParams, service_config
-from src.streamlit_app.utils import (is_port_in_use, get_log_message, stop_running_locust_pids,
-                                     prune_db_for_terminated_process, add_locust_pids_to_db, TEST_TYPE_TO_DRIVER_MAP)
+from src.streamlit_app.utils import (get_log_message, stop_running_locust_pids, allocate_session_config,
+                                     prune_db_for_terminated_process, add_locust_pids_to_db, TEST_TYPE_TO_DRIVER_MAP,
+                                     get_connected_workers, get_running_sessions, get_recent_sessions,
+                                     wait_for_session_ready, wait_for_session_reports, wait_for_session_upload)
 
 logger = logging.getLogger()
 
@@ -21,11 +24,12 @@ def init_streamlit():
 
 
 def start_olaf_session(advanced_params: typing.Dict, resource_args):
-    st.session_state["session_requested"] = True
     logger.info(get_log_message("session-requested", test_type))
-    if is_port_in_use():
-        logger.info(get_log_message("session-failed", "existing session"))
-        st.error("another load session in progress. try closing it before proceeding!")
+    session_config = allocate_session_config()
+    if session_config is None:
+        logger.info(get_log_message("session-failed", "no free session slot"))
+        st.error(f"all {service_config.locust_config.max_sessions} load session slots are in use. "
+                 f"try closing one before proceeding!")
     else:
         with st.spinner("initializing session..."):
             if advanced_params:
@@ -33,30 +37,73 @@ def start_olaf_session(advanced_params: typing.Dict, resource_args):
 
             test_type_driver = TEST_TYPE_TO_DRIVER_MAP.get(test_type, None)
             assert test_type_driver is not None
-            p_ids = test_type_driver(resource_args,
-                                     locust_config=service_config.locust_config,
-                                     advanced_params=advanced_params,
-                                     load_session_name=load_session_name, )
-
-            add_locust_pids_to_db(test_type, p_ids)
-            time.sleep(5)
-
+            locust_session = test_type_driver(resource_args,
+                                              locust_config=session_config,
+                                              advanced_params=advanced_params,
+                                              load_session_name=load_session_name, )
+
+            add_locust_pids_to_db(test_type, locust_session, session_config)
+            try:
+                is_ready = wait_for_session_ready(locust_session, session_config)
+            except RuntimeError as err:
+                logger.info(get_log_message("session-failed", err))
+                st.error(str(err))
+                return
+
+        if not is_ready:
+            st.warning(f"session is not ready after {session_config.ready_timeout}s, "
+                       f"some workers may still be connecting")
         logger.info(get_log_message("session-started", test_type))
 
 
-def stop_olaf_session(placeholder_stop_btn, placeholder_link):
-    stop_load_btn = placeholder_stop_btn.button("STOP RUNNING LOAD SESSION")
-    placeholder_link.markdown(f"The session is running at [link]({'/active_session/'})")
+def show_connected_workers(placeholder_workers, port):
+    with placeholder_workers.container():
+        with st.expander("connected workers"):
+            workers = get_connected_workers(port)
+            if workers:
+                st.table(workers)
+            else:
+                st.write("no workers connected yet")
+
+
+def show_recent_sessions():
+    with st.expander("recent sessions"):
+        sessions = get_recent_sessions()
+        if sessions:
+            st.table([{"resource": session["resource"],
+                       "status": session["status"],
+                       "port": session["port"],
+                       "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(session["started_at"])),
+                       "duration s": round((session["ended_at"] or time.time()) - session["started_at"]),
+                       **(session["metrics"] or {})}
+                      for session in sessions])
+        else:
+            st.write("no sessions yet")
+
+
+def stop_olaf_session(session, placeholder_stop_btn, placeholder_link, placeholder_workers):
+    port = session["port"]
+    stop_load_btn = placeholder_stop_btn.button(f"STOP RUNNING {session['resource']} LOAD SESSION ({port})",
+                                                key=f"stop_{port}")
+    placeholder_link.markdown(f"The {session['resource']} session is running at [link](/active_session/{port}/)")
+    show_connected_workers(placeholder_workers, port)
     if stop_load_btn:
         with st.spinner("cleaning up and closing session..."):
-            stop_running_locust_pids()
+            stop_running_locust_pids(port)
             placeholder_stop_btn.empty()
             placeholder_link.empty()
-            # give time to upload results to s3 and die
-            time.sleep(5)
+            placeholder_workers.empty()
+            if not wait_for_session_reports(session):
+                st.warning("session closed without writing its reports")
         with st.spinner("hold on uploading results to s3 (if configured)..."):
-            # give some more time to upload results to s3 and die
-            time.sleep(5)
+            upload_status = wait_for_session_upload(session)
+            if upload_status and upload_status["status"] == "failed":
+                st.warning(f"uploading to s3 failed for {', '.join(upload_status['errors'])}")
+            elif upload_status and upload_status["status"] == "incomplete":
+                st.warning(f"uploaded to s3 before the raw timing logs "
+                           f"{', '.join(upload_status['incomplete_logs'])} were closed by their workers")
+            elif upload_status and upload_status["status"] not in ("done", "skipped"):
+                st.info("results are still uploading to s3 in the background")
         with st.spinner("pruning process cache for performance..."):
             prune_db_for_terminated_process()
 
@@ -80,7 +127,8 @@ if __name__ == '__main__':
                     service_args = show_core_services(test_type=selected_service,
                                                       is_cocktail=True,
                                                       key=endpoint_num, )
-                    resource_args.append(service_args)
+                    weight, fixed_count, target_rps = get_cocktail_mix_input(key=endpoint_num)
+                    resource_args.append(CocktailEndpointNt(service_args, weight, fixed_count, target_rps))
 
     else:
         service_args = show_core_services(test_type)
@@ -92,11 +140,11 @@ if __name__ == '__main__':
 
     start_session_btn = st.button(f"START LOAD SESSION")
 
-    placeholder_stop_btn = st.empty()
-    placeholder_link = st.empty()
-
     if start_session_btn:
         start_olaf_session(advanced_params, resource_args)
 
-    if st.session_state.get("session_requested", False) is True and is_port_in_use():
-        stop_olaf_session(placeholder_stop_btn, placeholder_link)
+    # every running session on this box is listed, whoever started it
+    for session in get_running_sessions():
+        stop_olaf_session(session, st.empty(), st.empty(), st.empty())
+
+    show_recent_sessions()
@@ -13,6 +13,8 @@ from src.constants import CONFIG_PATH
 class ServiceSettings(BaseSettings):
     ENCRYPTION_KEY: typing.Optional[str]
     ENVIRONMENT: typing.Optional[str]
+    # shared by the dashboard and its worker containers, a session bundle is only handed to a worker presenting it
+    OLAF_WORKER_TOKEN: typing.Optional[str]
 
     class Config:
         extra = Extra.ignore
@@ -39,10 +41,24 @@ class S3Config(RootConfig):
     region: str
     bucket_name: str
     base_path: str
+    # files uploaded at once, and parts per file for multipart uploads
+    upload_concurrency: conint(ge=1, le=64) = 8
+    multipart_concurrency: conint(ge=1, le=32) = 4
+    compress: bool = False
+    # seconds the upload waits for workers to close their raw timing logs
+    raw_timing_timeout: conint(ge=0, le=3600) = 60
 
 
 class LocustConfig(RootConfig):
+    # first ports of the range, session slot n uses port + n and master_bind_port + n
     port: int
+    master_bind_port: int = 5557
+    max_sessions: int = 1
+    session_slot: int = 0
+    # seconds to wait for a session to come up, for its reports once stopped and for the upload after that
+    ready_timeout: conint(ge=1) = 60
+    report_timeout: conint(ge=1) = 30
+    upload_timeout: conint(ge=1) = 120
 
 
 class ServiceConfig(BaseModel):
@@ -57,6 +73,22 @@ class OlafAdvancedParams(BaseModel):
     users: conint(ge=1, le=500)
     spawn_rate: confloat(ge=0.1, le=500)
     load_duration: conint(ge=20, le=10000)
+    arrival_mode: typing.Literal["closed", "fixed", "poisson"] = "closed"
+    target_rps: confloat(gt=0, le=100000) = None
+    co_correction: bool = False
+    hdr_significant_figures: conint(ge=1, le=5) = 3
+    raw_timing_log: bool = False
+    generator_overhead: bool = True
+    overhead_threshold_ms: confloat(gt=0, le=10000) = 5.0
+    remote_workers: conint(ge=0, le=1000) = 0
+    num_workers: conint(ge=1, le=512) = None
+    fork_workers: bool = True
+
+    @validator("target_rps", always=True, allow_reuse=True)
+    def validate_target_rps(cls, target_rps, values):
+        if values.get("arrival_mode", "closed") != "closed":
+            assert target_rps is not None, "target rps is required for open loop arrivals"
+        return target_rps
 
     class Config:
         extra = Extra.ignore
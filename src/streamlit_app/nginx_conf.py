@@ -0,0 +1,31 @@
+import argparse
+
+from jinja2 import Template
+
+from src.constants import ROOT_PATH
+from src.streamlit_app.datamodel import service_config, LocustConfig
+
+NGINX_TEMPLATE_PATH = ROOT_PATH.parent / "nginx.conf.template"
+
+
+def session_ports(locust_config: LocustConfig = service_config.locust_config):
+    # locust web port of every concurrent session slot, nothing else is proxied under /active_session/
+    return [locust_config.port + slot for slot in range(locust_config.max_sessions)]
+
+
+def render_nginx_conf(template: str, locust_config: LocustConfig = service_config.locust_config) -> str:
+    return Template(template).render(session_ports="|".join(str(port) for port in session_ports(locust_config)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="render the nginx config for the session ports of this environment")
+    parser.add_argument("output", type=str, help="nginx config file to write")
+    options = parser.parse_args()
+    with open(NGINX_TEMPLATE_PATH) as f:
+        template = f.read()
+    with open(options.output, "w") as f:
+        f.write(render_nginx_conf(template))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from src.constants import SESSION_REGISTRY_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resource TEXT NOT NULL,
+    status TEXT NOT NULL,
+    p_ids TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    port INTEGER NOT NULL,
+    master_bind_port INTEGER NOT NULL,
+    session_dir TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    metrics TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_by_status ON sessions (status, port);
+CREATE INDEX IF NOT EXISTS sessions_by_start ON sessions (started_at);
+"""
+JSON_COLUMNS = ["p_ids", "metrics"]
+# aggregated row of csv_summary.csv kept as the headline of a finished session
+HEADLINE_METRICS = {
+    "Request Count": "requests",
+    "Failure Count": "failures",
+    "Requests/s": "rps",
+    "Average Response Time": "avg_ms",
+    "50%": "p50_ms",
+    "99%": "p99_ms",
+    "99.9%": "p99.9_ms",
+}
+
+
+class SessionRegistry:
+
+    def __init__(self, path=SESSION_REGISTRY_PATH):
+        self.path = str(path)
+        with self.connect() as conn:
+            # WAL lets streamlit reruns read while another one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        # one short lived connection per call, streamlit reruns each run in their own thread
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        session = dict(row)
+        for column in JSON_COLUMNS:
+            session[column] = json.loads(session[column]) if session[column] else None
+        return session
+
+    def add(self, resource: str, p_ids: List[int], slot: int, port: int, master_bind_port: int,
+            session_dir: Optional[str]) -> int:
+        with self.connect() as conn:
+            cursor = conn.execute("INSERT INTO sessions (resource, status, p_ids, slot, port, master_bind_port, "
+                                  "session_dir, started_at) VALUES (?, 'running', ?, ?, ?, ?, ?, ?)",
+                                  (resource, json.dumps(p_ids), slot, port, master_bind_port, session_dir,
+                                   time.time()))
+            return cursor.lastrowid
+
+    def running(self, port: Optional[int] = None) -> List[Dict]:
+        query = "SELECT * FROM sessions WHERE status = 'running'"
+        params = ()
+        if port is not None:
+            query += " AND port = ?"
+            params = (port,)
+        with self.connect() as conn:
+            return [self._to_dict(row) for row in conn.execute(query + " ORDER BY slot", params)]
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        with self.connect() as conn:
+            return [self._to_dict(row) for row in
+                    conn.execute("SELECT * FROM sessions ORDER BY started_at DESC LIMIT ?", (limit,))]
+
+    def terminate(self, session_id: int):
+        with self.connect() as conn:
+            conn.execute("UPDATE sessions SET status = 'terminated', ended_at = ? "
+                         "WHERE session_id = ? AND status = 'running'", (time.time(), session_id))
+
+    def record_metrics(self, session_id: int, metrics: Dict):
+        with self.connect() as conn:
+            conn.execute("UPDATE sessions SET metrics = ? WHERE session_id = ?", (json.dumps(metrics), session_id))
+
+    def prune(self, keep: int = 1_000):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE status = 'terminated' AND session_id NOT IN "
+                         "(SELECT session_id FROM sessions ORDER BY started_at DESC LIMIT ?)", (keep,))
+
+
+def read_headline_metrics(session_dir: Optional[str]) -> Optional[Dict]:
+    summary_path = os.path.join(session_dir or "", "csv_summary.csv")
+    if not session_dir or not os.path.exists(summary_path):
+        return None
+    with open(summary_path) as f:
+        for row in csv.DictReader(f):
+            if row.get("Name") == "Aggregated" and not row.get("Type"):
+                return {key: row[column] for column, key in HEADLINE_METRICS.items() if column in row}
+    return None
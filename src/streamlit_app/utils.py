@@ -1,7 +1,10 @@
+import json
+import os
 import socket
+import time
+import urllib.request
 
 import psutil
-from tinydb import TinyDB, Query
 
 from src.olaf.user_drivers import (rest_get_driver, rest_post_driver,
                                    elasticsearch_read_driver, mongo_read_driver,
@@ -10,9 +13,16 @@ from src.olaf.user_drivers import (rest_get_driver, rest_post_driver,
                                    redis_stream_producer_driver, pine_cone_vector_search_driver,
                                    redis_vector_search_driver
                                    )
-from src.streamlit_app.datamodel import service_config
+from src.constants import REPORTS_WRITTEN_MARKER
+from src.olaf.s3_uploader import read_upload_status
+from src.olaf.user_drivers import LocustSessionNt
+from src.streamlit_app.datamodel import service_config, LocustConfig
+from src.streamlit_app.session_registry import SessionRegistry, read_headline_metrics
 
-db = TinyDB("load_test_db.json")
+registry = SessionRegistry()
+
+POLL_INTERVAL = 0.25
+UPLOAD_PENDING_STATES = {"pending", "uploading"}
 
 TEST_TYPE_TO_DRIVER_MAP = {
     "REST GET": rest_get_driver,
@@ -31,29 +41,125 @@ TEST_TYPE_TO_DRIVER_MAP = {
 }
 
 
-def stop_running_locust_pids():
-    q = Query()
-    for p in db.search(q.status == "running"):
-        for pid in p.get("p_ids", []):
+def poll_until(condition, timeout) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def _alive_processes(p_ids):
+    # locust processes are children of streamlit, an exited one lingers as a zombie until it is reaped
+    processes = []
+    for pid in p_ids:
+        try:
+            proc = psutil.Process(pid)
+            if proc.status() != psutil.STATUS_ZOMBIE:
+                processes.append(proc)
+        except psutil.NoSuchProcess:
+            pass
+    return processes
+
+
+def stop_running_locust_pids(port=None):
+    sessions = registry.running(port)
+    for session in sessions:
+        for proc in _alive_processes(session["p_ids"]):
             try:
-                proc = psutil.Process(pid)
                 proc.terminate()
-            except Exception as err:
+            except psutil.NoSuchProcess:
                 pass
-    db.update({"status": "terminated"}, q.status == "running")
+        registry.terminate(session["session_id"])
+    return sessions
+
+
+def wait_for_session_ready(locust_session: LocustSessionNt,
+                           locust_config: LocustConfig = service_config.locust_config) -> bool:
+    # the master is started last, every other process is a local worker that has to connect to it
+    master_pid = locust_session.p_ids[-1]
+    expected_workers = len(locust_session.p_ids) - 1
+
+    def is_ready():
+        if not _alive_processes([master_pid]):
+            raise RuntimeError(f"locust master exited during startup, see {locust_session.session_dir}")
+        return is_port_in_use(locust_config.port) and len(get_connected_workers(locust_config.port)) >= expected_workers
+
+    return poll_until(is_ready, locust_config.ready_timeout)
+
+
+def wait_for_session_reports(session, locust_config: LocustConfig = service_config.locust_config) -> bool:
+    # a master that exits without the marker (killed, or not a master at all) has nothing more to write
+    marker_path = os.path.join(session["session_dir"] or "", REPORTS_WRITTEN_MARKER)
+    written = poll_until(lambda: os.path.exists(marker_path) or not _alive_processes(session["p_ids"]),
+                         locust_config.report_timeout)
+    _, still_alive = psutil.wait_procs(_alive_processes(session["p_ids"]), timeout=POLL_INTERVAL)
+    for proc in still_alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+    return written and os.path.exists(marker_path)
+
+
+def wait_for_session_upload(session, locust_config: LocustConfig = service_config.locust_config):
+    # None when no upload was started for the session
+    def upload_status():
+        return read_upload_status(session["session_dir"]) if session["session_dir"] else None
+
+    poll_until(lambda: (upload_status() or {}).get("status") not in UPLOAD_PENDING_STATES,
+               locust_config.upload_timeout)
+    return upload_status()
+
+
+def record_finished_session_metrics():
+    # the master writes csv_summary.csv while quitting, so headlines are picked up once it is there
+    for session in registry.recent():
+        if session["status"] == "terminated" and session["metrics"] is None:
+            metrics = read_headline_metrics(session["session_dir"])
+            if metrics is not None:
+                registry.record_metrics(session["session_id"], metrics)
 
 
 def prune_db_for_terminated_process():
-    if len(db) > 1_000:
-        q = Query()
-        db.remove(q.status == "terminated")
+    record_finished_session_metrics()
+    registry.prune()
 
 
-def add_locust_pids_to_db(test_type, p_ids):
-    db.insert({"resource": test_type,
-               "status": "running",
-               "p_ids": p_ids})
-    return True
+def add_locust_pids_to_db(test_type, locust_session: LocustSessionNt,
+                          locust_config: LocustConfig = service_config.locust_config):
+    return registry.add(test_type, locust_session.p_ids,
+                        slot=locust_config.session_slot,
+                        port=locust_config.port,
+                        master_bind_port=locust_config.master_bind_port,
+                        session_dir=locust_session.session_dir)
+
+
+def get_running_sessions():
+    # sessions whose processes all exited (autoquit) are marked terminated on the way
+    for session in registry.running():
+        if not _alive_processes(session["p_ids"]):
+            registry.terminate(session["session_id"])
+    return registry.running()
+
+
+def get_recent_sessions(limit=10):
+    record_finished_session_metrics()
+    return registry.recent(limit)
+
+
+def allocate_session_config(locust_config: LocustConfig = service_config.locust_config):
+    running_slots = {session["slot"] for session in get_running_sessions()}
+    for slot in range(locust_config.max_sessions):
+        session_config = locust_config.copy(update={"port": locust_config.port + slot,
+                                                    "master_bind_port": locust_config.master_bind_port + slot,
+                                                    "session_slot": slot})
+        if slot in running_slots or is_port_in_use(session_config.port) \
+                or is_port_in_use(session_config.master_bind_port):
+            continue
+        return session_config
+    return None
 
 
 def get_log_message(log_event, message):
@@ -63,3 +169,14 @@ def get_log_message(log_event, message):
 def is_port_in_use(port=service_config.locust_config.port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('localhost', port)) == 0
+
+
+def get_connected_workers(port=service_config.locust_config.port):
+    try:
+        with urllib.request.urlopen(f"http://localhost:{port}/stats/requests", timeout=5) as response:
+            stats = json.load(response)
+    except OSError:
+        return []
+    return [{"worker": w["id"], "state": w["state"], "users": w["user_count"],
+             "cpu %": w["cpu_usage"], "memory MB": round(w["memory_usage"] / 2 ** 20)}
+            for w in stats.get("workers", [])]
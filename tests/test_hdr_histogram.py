@@ -0,0 +1,26 @@
+from src.olaf.hdr_histogram import HdrHistogram
+
+
+def test_sparse_report_round_trip():
+    worker = HdrHistogram(5)
+    for value in [120, 950, 950, 30_000, 2_500_000]:
+        worker.record(value)
+    sparse = worker.to_sparse()
+    assert len(sparse) == 4
+    assert sparse == sorted(sparse)
+
+    master = HdrHistogram(5)
+    master.add_sparse(sparse, worker.max_value)
+    assert master.total_count == 5
+    assert master.value_at_percentile(50) == 950
+    assert master.value_at_percentile(100) == 2_500_000
+
+
+def test_reset_clears_recorded_counts():
+    histogram = HdrHistogram(3)
+    histogram.record(1234)
+    histogram.reset()
+    assert histogram.to_sparse() == []
+    assert not any(histogram.counts)
+    histogram.record(10)
+    assert histogram.to_sparse() == [[histogram._counts_index(10), 1]]
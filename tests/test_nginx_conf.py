@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("jinja2")
+pytest.importorskip("cryptocode")
+
+from src.streamlit_app.datamodel import LocustConfig
+from src.streamlit_app.nginx_conf import NGINX_TEMPLATE_PATH, render_nginx_conf
+
+
+def test_only_session_ports_are_proxied():
+    locust_config = LocustConfig(port=12311, max_sessions=3)
+    conf = render_nginx_conf(NGINX_TEMPLATE_PATH.read_text(), locust_config)
+    assert "(?<session_port>12311|12312|12313)(/|$)" in conf
+    assert "return 404;" in conf
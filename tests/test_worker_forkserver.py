@@ -0,0 +1,57 @@
+import os
+import textwrap
+
+import pytest
+
+pytest.importorskip("locust")
+pytest.importorskip("psutil")
+
+from src.olaf.worker_forkserver import locustfile_imports, start_forked_workers
+
+LOCUSTFILE = """
+import os
+
+from locust import User, events, task, constant
+
+with open(os.environ["OLAF_TEST_MARKS"], "a") as f:
+    f.write("body\\n")
+
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    with open(os.environ["OLAF_TEST_MARKS"], "a") as f:
+        f.write("init\\n")
+
+
+class IdleUser(User):
+    wait_time = constant(1)
+
+    @task
+    def idle(self):
+        pass
+"""
+
+
+def test_locustfile_imports_are_read_without_running_the_body(tmp_path):
+    locustfile = tmp_path / "imports_only.py"
+    locustfile.write_text(textwrap.dedent("""
+        import os, json
+        from locust import User
+        from . import sibling
+        raise RuntimeError("the body must not run")
+    """))
+    assert locustfile_imports(str(locustfile)) == ["os", "json", "locust"]
+
+
+def test_forked_worker_runs_locustfile_and_init_listener_once(tmp_path, monkeypatch):
+    marks = tmp_path / "marks"
+    monkeypatch.setenv("OLAF_TEST_MARKS", str(marks))
+    locustfile = tmp_path / "init_listener.py"
+    locustfile.write_text(LOCUSTFILE)
+
+    forkserver, pids = start_forked_workers(["-f", str(locustfile), "--headless", "--users", "1",
+                                             "--spawn-rate", "1", "--run-time", "2s", "--loglevel", "WARNING"],
+                                            sorted(os.sched_getaffinity(0))[:1])
+    assert len(pids) == 1
+    assert forkserver.wait(timeout=60) == 0
+    assert marks.read_text().splitlines() == ["body", "init"]
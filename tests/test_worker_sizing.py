@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("psutil")
+
+from src.olaf import worker_sizing
+
+
+@pytest.fixture
+def host(monkeypatch):
+    def configure(affinity, cpu_count, quota=None):
+        monkeypatch.setattr(worker_sizing, "usable_cpus", lambda: affinity)
+        monkeypatch.setattr(worker_sizing.os, "cpu_count", lambda: cpu_count)
+        monkeypatch.setattr(worker_sizing, "cgroup_cpu_quota", lambda: quota)
+        monkeypatch.setattr(worker_sizing, "available_memory", lambda: 2 ** 40)
+    return configure
+
+
+def test_quota_only_sizes_unpinned_workers(host):
+    host(list(range(16)), 16, quota=4.0)
+    plan = worker_sizing.plan_workers()
+    assert plan == worker_sizing.WorkerPlan(3, [None], [None, None, None])
+
+
+def test_cpuset_pins_workers(host):
+    host([8, 9, 10, 11], 16)
+    plan = worker_sizing.plan_workers()
+    assert plan == worker_sizing.WorkerPlan(3, [8], [9, 10, 11])